@@ -0,0 +1,106 @@
+"""
+Execution time of a cheap NumPy model over studies of increasing size,
+executed once per dataset (Process) and by a single vectorized call for
+all datasets (BatchProcess).
+
+    python benchmarks/bench_batch_process.py [sizes...]
+"""
+from __future__ import annotations
+
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import attrs
+import numpy as np
+import pandas as pd
+
+from nuremics import BatchProcess, Process
+from nuremics.core.scheduler import run_process
+
+
+@attrs.define
+class Model(Process):
+
+    x: float = attrs.field(init=False, metadata={"input": True})
+    out: Path = attrs.field(init=False, metadata={"output": True}, converter=Path)
+
+    def __call__(self) -> None:
+        super().__call__()
+
+        self.operation()
+
+    def operation(self) -> None:
+
+        np.save(self.out, np.sin(self.x) * np.arange(10))
+
+
+@attrs.define
+class BatchModel(BatchProcess):
+
+    x: float = attrs.field(init=False, metadata={"input": True})
+    out: Path = attrs.field(init=False, metadata={"output": True})
+
+    def __call__(self) -> None:
+        super().__call__()
+
+        self.operation()
+
+    def operation(self) -> None:
+
+        values = np.sin(self.x)[:, None] * np.arange(10)
+        for file, value in zip(self.out, values):
+            np.save(file, value)
+
+
+def build_process(
+    cls: type,
+    nb_datasets: int,
+) -> Process:
+
+    index = [f"Test{i}" for i in range(nb_datasets)]
+    process = cls(
+        study="Study",
+        df_user_params=pd.DataFrame({"x": np.linspace(0, 1, nb_datasets)}, index=index),
+        dict_user_params={},
+        dict_user_paths={},
+        params={"x": "x"},
+        output_paths={"out": "out.npy"},
+        fixed_params=[],
+        variable_params=["x"],
+        fixed_paths=[],
+        variable_paths=[],
+    )
+    process.name = cls.__name__
+    process.initialize()
+
+    return process
+
+
+def timed(
+    cls: type,
+    nb_datasets: int,
+) -> float:
+
+    process = build_process(cls, nb_datasets)
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_process(process, list(process.df_params.index), Path(tmp), chdir=False)
+        return time.perf_counter() - start
+
+
+def main(
+    sizes: list,
+) -> None:
+
+    print(f"{'datasets':>10} {'Process (s)':>12} {'BatchProcess (s)':>17}")
+    for nb_datasets in sizes:
+        print(f"{nb_datasets:>10} {timed(Model, nb_datasets):>12.3f} {timed(BatchModel, nb_datasets):>17.3f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000])
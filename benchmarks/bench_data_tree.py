@@ -0,0 +1,133 @@
+"""
+Cost of the data tree initialization (WorkFlow.init_data_tree) for a study
+with one variable input path, on disk and on tmpfs:
+
+- first launch (all dataset folders created),
+- relaunch without changes,
+- relaunch with 1% of the datasets replaced,
+
+and of the reconciliation of the dataset folders alone, on the same tree
+(one input file per dataset) and for the same unchanged relaunch, by the
+current implementation (WorkFlow.reconcile_datasets_tree) and by the former
+per-dataset scan (reference).
+
+    python benchmarks/bench_data_tree.py [sizes...]
+"""
+from __future__ import annotations
+
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from nuremics.core.trash import Trash
+from nuremics.core.workflow import WorkFlow
+
+
+def build_workflow(
+    working_dir: Path,
+    datasets: list,
+) -> WorkFlow:
+
+    # Minimal workflow state used by init_data_tree
+    workflow = WorkFlow.__new__(WorkFlow)
+    workflow.working_dir = working_dir
+    workflow.cache_dir = working_dir / ".cache"
+    workflow.trash_dir = working_dir / ".trash"
+    workflow.trash = Trash(workflow.trash_dir, background=False)
+    workflow.shard = False
+    workflow.studies = ["Study"]
+    workflow.dict_studies = {"config": {"Study": {"user_params": {"param": True}, "user_paths": {"input.txt": True}}}}
+    workflow.fixed_params = {"Study": []}
+    workflow.variable_params = {"Study": ["param"]}
+    workflow.fixed_paths = {"Study": []}
+    workflow.variable_paths = {"Study": ["input.txt"]}
+    workflow.user_paths = ["input.txt"]
+    workflow.dict_datasets = {}
+    workflow.dict_inputs = {}
+
+    study_dir = working_dir / "Study"
+    study_dir.mkdir(parents=True, exist_ok=True)
+    lines = ["ID,param,EXECUTE"] + [f"{idx},1.0,1" for idx in datasets]
+    (study_dir / "inputs.csv").write_text("\n".join(lines) + "\n")
+
+    return workflow
+
+
+def legacy_scan(
+    datasets_dir: Path,
+    datasets: list,
+    variable_paths: list,
+) -> None:
+
+    # Former per-dataset mkdir and listing, then full scan with list membership
+    datasets_dir.mkdir(exist_ok=True, parents=True)
+    for index in datasets:
+        (datasets_dir / index).mkdir(exist_ok=True, parents=True)
+        for path in (datasets_dir / index).iterdir():
+            if path.resolve().name not in variable_paths:
+                if path.is_file():
+                    path.unlink()
+                else:
+                    shutil.rmtree(path)
+    for folder in [f for f in datasets_dir.iterdir() if f.is_dir()]:
+        if os.path.split(folder)[-1] not in datasets:
+            shutil.rmtree(folder)
+
+
+def timed(
+    func: object,
+) -> float:
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+
+    return time.perf_counter() - start
+
+
+def main(
+    sizes: list,
+) -> None:
+
+    roots = {"disk": tempfile.gettempdir()}
+    if os.path.isdir("/dev/shm"):
+        roots["tmpfs"] = "/dev/shm"
+
+    print(f"{'fs':>6} {'datasets':>10} {'first (s)':>10} {'unchanged (s)':>14} {'1% changed (s)':>15} {'reconcile (s)':>14} {'former (s)':>11}")
+    for fs, root in roots.items():
+        for size in sizes:
+            with tempfile.TemporaryDirectory(dir=root) as tmp:
+
+                working_dir = Path(tmp)
+                datasets = [f"Test{i}" for i in range(size)]
+
+                workflow = build_workflow(working_dir, datasets)
+                first = timed(workflow.init_data_tree)
+                unchanged = timed(workflow.init_data_tree)
+
+                changed = datasets[size // 100:] + [f"New{i}" for i in range(size // 100)]
+                workflow = build_workflow(working_dir, changed)
+                modified = timed(workflow.init_data_tree)
+
+                # Input file of each dataset (kept by both implementations)
+                datasets_dir = working_dir / "Study" / "0_inputs" / "0_datasets"
+                for idx in changed:
+                    (datasets_dir / idx / "input.txt").touch()
+
+                # Same tree and same unchanged relaunch for both implementations
+                reconcile = timed(lambda: workflow.reconcile_datasets_tree("Study", datasets_dir))
+                if size <= 10000:
+                    former = f"{timed(lambda: legacy_scan(datasets_dir, changed, ['input.txt'])):.3f}"
+                else:
+                    former = "-"
+
+                print(f"{fs:>6} {size:>10} {first:>10.3f} {unchanged:>14.3f} {modified:>15.3f} {reconcile:>14.3f} {former:>11}")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,52 @@
+"""
+Loading time of an output of all datasets for an overall analysis: loop
+of np.loadtxt calls (reference), Process.stack_outputs on first launch
+(parallel loading) and on relaunch (outputs unchanged, taken from cache).
+
+    python benchmarks/bench_load_outputs.py [sizes...]
+"""
+from __future__ import annotations
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from nuremics import Process
+from nuremics.core.paths import OutputPaths
+
+
+def main(
+    sizes: list,
+) -> None:
+
+    print(f"{'datasets':>10} {'loop (s)':>10} {'first (s)':>10} {'relaunch (s)':>13}")
+    for nb_datasets in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+
+            paths = OutputPaths()
+            for i in range(nb_datasets):
+                folder = tmp / f"Test{i}"
+                folder.mkdir()
+                np.savetxt(folder / "output.txt", np.full(100, i))
+                paths[f"Test{i}"] = str(folder / "output.txt")
+
+            start = time.perf_counter()
+            np.stack([np.loadtxt(path) for path in paths.values()])
+            loop = time.perf_counter() - start
+
+            timings = []
+            for _ in range(2):
+                process = Process(dict_paths={"output.txt": paths}, working_dir=tmp)
+                start = time.perf_counter()
+                process.stack_outputs("output.txt", np.loadtxt)
+                timings.append(time.perf_counter() - start)
+
+        print(f"{nb_datasets:>10} {loop:>10.3f} {timings[0]:>10.3f} {timings[1]:>13.3f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000])
@@ -0,0 +1,141 @@
+"""
+Per-dataset cost of checking the outputs of a previous process in a serial
+run, for studies of increasing size. Units are executed one dataset at a
+time through run_process, as by the serial scheduler, with the required
+paths checked once for the process step (by the workflow, before its first
+unit) and, as formerly, by each unit (up to 10,000 datasets). The number of
+checks (folder listings, each one a round trip on network filesystems) is
+reported along the time, which is dominated by the units on a local disk.
+
+    python benchmarks/bench_output_paths.py [sizes...]
+"""
+from __future__ import annotations
+
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import attrs
+import numpy as np
+import pandas as pd
+
+from nuremics import Process
+from nuremics.core import process as core_process
+from nuremics.core.scheduler import run_process
+from nuremics.core.utils import existing_paths
+
+
+@attrs.define
+class Reader(Process):
+
+    x: float = attrs.field(init=False, metadata={"input": True})
+    path: Path = attrs.field(init=False, metadata={"input": True}, converter=Path)
+
+    def __call__(self) -> None:
+        super().__call__()
+
+
+def build_outputs(
+    root: Path,
+    size: int,
+) -> dict:
+
+    # One output file per dataset, as written by a case process
+    outputs = {}
+    for i in range(size):
+        folder = root / f"Test{i}"
+        folder.mkdir()
+        (folder / "output.txt").touch()
+        outputs[f"Test{i}"] = str(folder / "output.txt")
+
+    return {"output.txt": outputs}
+
+
+def build_process(
+    dict_paths: dict,
+) -> Process:
+
+    index = list(dict_paths["output.txt"])
+    process = Reader(
+        study="Study",
+        df_user_params=pd.DataFrame({"x": np.linspace(0, 1, len(index))}, index=index),
+        dict_user_params={},
+        dict_user_paths={},
+        dict_paths=dict_paths,
+        params={"x": "x"},
+        required_paths={"path": "output.txt"},
+        fixed_params=[],
+        variable_params=["x"],
+        fixed_paths=[],
+        variable_paths=[],
+        silent=True,
+    )
+    process.name = "Reader"
+    process.initialize()
+
+    return process
+
+
+def timed(
+    dict_paths: dict,
+    folder_path: Path,
+    by_step: bool,
+) -> tuple:
+
+    process = build_process(dict_paths)
+    indices = list(process.df_params.index)
+    folder_path.mkdir()
+
+    # Listings of the folders of the required paths
+    calls = []
+
+    def counting_paths(paths: list) -> set:
+        calls.append(len(paths))
+        return existing_paths(paths)
+    core_process.existing_paths = counting_paths
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if by_step:
+            process.check_required_paths(indices)
+        for idx in indices:
+            if not by_step:
+                process.checked_paths = set()
+            run_process(process, [idx], folder_path, chdir=False)
+    elapsed = (time.perf_counter() - start) / len(indices) * 1e6
+
+    core_process.existing_paths = existing_paths
+
+    return elapsed, len(calls)
+
+
+def main(
+    sizes: list,
+) -> None:
+
+    # Warm-up (imports and first writes are not timed)
+    with tempfile.TemporaryDirectory() as tmp:
+        timed(build_outputs(Path(tmp), 10), Path(tmp) / "Reader", True)
+
+    print(f"{'datasets':>10} {'by step (us/dataset)':>22} {'checks':>8} {'by unit (us/dataset)':>22} {'checks':>8}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+
+            (Path(tmp) / "1_Writer").mkdir()
+            dict_paths = build_outputs(Path(tmp) / "1_Writer", size)
+
+            by_step, step_checks = timed(dict_paths, Path(tmp) / "2_Reader", True)
+            if size <= 10000:
+                by_unit, unit_checks = timed(dict_paths, Path(tmp) / "2_Reader_by_unit", False)
+                by_unit, unit_checks = f"{by_unit:.2f}", str(unit_checks)
+            else:
+                by_unit, unit_checks = "-", "-"
+
+            print(f"{size:>10} {by_step:>22.2f} {step_checks:>8} {by_unit:>22} {unit_checks:>8}")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or [100, 1000, 10000])
@@ -0,0 +1,58 @@
+"""
+Time during which the caller is blocked when deleting a results tree of
+many small files: synchronous rmtree vs the deletion service (rename into
+the trash, background deletion), and total time until the trash is empty.
+
+    python benchmarks/bench_trash.py [nb_files...]
+"""
+from __future__ import annotations
+
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from nuremics.core.trash import Trash
+
+
+def build_tree(
+    folder: Path,
+    nb_files: int,
+) -> None:
+
+    # 100 files per dataset folder
+    for i in range(nb_files):
+        sub = folder / f"Test{i // 100}"
+        if i % 100 == 0:
+            sub.mkdir(parents=True)
+        (sub / f"output{i % 100}.txt").write_bytes(b"0" * 1024)
+
+
+def main(
+    sizes: list,
+) -> None:
+
+    print(f"{'files':>10} {'rmtree (s)':>12} {'trash blocking (s)':>20} {'trash total (s)':>17}")
+    for nb_files in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+
+            build_tree(tmp / "a", nb_files)
+            start = time.perf_counter()
+            shutil.rmtree(tmp / "a")
+            sync = time.perf_counter() - start
+
+            build_tree(tmp / "b", nb_files)
+            trash = Trash(tmp / ".trash")
+            start = time.perf_counter()
+            trash.remove(tmp / "b")
+            blocking = time.perf_counter() - start
+            trash.shutdown()
+            total = time.perf_counter() - start
+
+        print(f"{nb_files:>10} {sync:>12.4f} {blocking:>20.6f} {total:>17.4f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
@@ -1,2 +1,3 @@
 from nuremics.core import Application as Application
-from nuremics.core import Process as Process
\ No newline at end of file
+from nuremics.core import BatchProcess as BatchProcess
+from nuremics.core import Process as Process
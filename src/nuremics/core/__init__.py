@@ -1,2 +1,3 @@
 from .application import Application as Application
-from .process import Process as Process
\ No newline at end of file
+from .process import BatchProcess as BatchProcess
+from .process import Process as Process
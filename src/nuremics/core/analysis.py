@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import uuid
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+
+def get_code_key(
+    code: object,
+) -> str:
+
+    # Bytecode, constants (nested code objects included) and referenced names
+    sha = hashlib.sha256(code.co_code)
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            sha.update(get_code_key(const).encode())
+        else:
+            sha.update(repr(const).encode())
+    sha.update(repr(code.co_names).encode())
+
+    return sha.hexdigest()
+
+
+def get_value_key(
+    value: object,
+    seen: set = None,
+) -> str:
+
+    # Functions by code, plain values by content, other objects by type only
+    # (their content may change, an explicit key is needed to tell them apart)
+    if callable(value):
+        return get_callable_key(value, seen)
+    if isinstance(value, tuple):
+        return "(" + ", ".join(get_value_key(v, seen) for v in value) + ")"
+    if (value is None) or isinstance(value, (bool, int, float, complex, str, bytes)):
+        return repr(value)
+
+    return f"<{type(value).__module__}.{type(value).__qualname__}>"
+
+
+def get_callable_key(
+    func: Callable,
+    seen: set = None,
+) -> str:
+
+    # Functions referring to themselves (recursion)
+    seen = set() if seen is None else seen
+    if id(func) in seen:
+        return "<recursive>"
+    seen.add(id(func))
+
+    # Partial functions (function and bound arguments)
+    if isinstance(func, functools.partial):
+        return f"partial({get_callable_key(func.func, seen)}, {get_value_key(func.args, seen)}, {get_value_key(tuple(sorted(func.keywords.items())), seen)})"
+
+    # Methods (function and instance)
+    if inspect.ismethod(func):
+        return f"method({get_callable_key(func.__func__, seen)}, {get_value_key(func.__self__, seen)})"
+
+    # Functions (code, defaults and closure)
+    code = getattr(func, "__code__", None)
+    if code is not None:
+        closure = []
+        for cell in func.__closure__ or ():
+            try:
+                value = cell.cell_contents
+            except ValueError:
+                value = None
+            closure.append(get_value_key(value, seen))
+        return f"function({get_code_key(code)}, {get_value_key(func.__defaults__, seen)}, {get_value_key(tuple(sorted((func.__kwdefaults__ or {}).items())), seen)}, {closure!r})"
+
+    # Callable instances (class and attributes)
+    if not isinstance(func, type) and hasattr(func, "__dict__") and callable(func):
+        call = getattr(type(func), "__call__", None)
+        call_key = get_callable_key(call, seen) if hasattr(call, "__code__") else ""
+        return f"instance({type(func).__module__}.{type(func).__qualname__}, {call_key}, {get_value_key(tuple(sorted(vars(func).items())), seen)})"
+
+    # Builtins and others
+    module = getattr(func, "__module__", None)
+    qualname = getattr(func, "__qualname__", repr(func))
+
+    return f"{module}.{qualname}"
+
+
+def get_loader_key(
+    name: str,
+    loader: Callable,
+    key: str = None,
+) -> str:
+
+    # Explicit key of the loader, or derived from its code and bound values
+    if key is None:
+        key = hashlib.sha256(get_callable_key(loader).encode()).hexdigest()
+
+    return f"{name}:{key}"
+
+
+def get_signature(
+    path: str,
+) -> tuple:
+
+    # Modification time and size (latest time and total size of the files of a directory)
+    stat = os.stat(path)
+    if not os.path.isdir(path):
+        return stat.st_mtime_ns, stat.st_size
+
+    mtime = stat.st_mtime_ns
+    size = 0
+    nb_entries = 0
+    for root, dirs, files in os.walk(path):
+        for name in dirs:
+            mtime = max(mtime, os.stat(os.path.join(root, name)).st_mtime_ns)
+        for name in files:
+            entry = os.stat(os.path.join(root, name))
+            mtime = max(mtime, entry.st_mtime_ns)
+            size += entry.st_size
+        nb_entries += len(dirs) + len(files)
+
+    return mtime, size, nb_entries
+
+
+def stack_values(
+    values: list,
+) -> np.ndarray:
+
+    # Values of all datasets as one array (first axis by dataset)
+    if len(values) == 0:
+        return np.empty((0,))
+
+    return np.stack([np.asarray(value) for value in values])
+
+
+def frame_values(
+    name: str,
+    values: dict,
+) -> pd.DataFrame:
+
+    index = list(values)
+    column = list(values.values())
+
+    # One column by key for mapping values
+    if (len(column) > 0) and all(isinstance(value, Mapping) for value in column):
+        return pd.DataFrame.from_records(column, index=index)
+
+    # A single column otherwise (arrays are kept as objects)
+    if all(np.ndim(value) == 0 for value in column):
+        series = pd.Series(column, index=index)
+    else:
+        series = pd.Series(column, index=index, dtype=object)
+
+    return pd.DataFrame({name: series})
+
+
+class OutputLoader:
+    """
+    Loads the outputs of the datasets with a user function, on a pool of
+    threads. Loaded values are cached by loader (code and bound values, or
+    explicit key) and by output signature (modification time and size, of
+    all files for a directory) in a pickle file, so that re-runs only load
+    modified outputs.
+    """
+
+    def __init__(self,
+        cache_file: Path = None,
+        max_workers: int = 16,
+    ) -> None:
+
+        self.cache_file = cache_file
+        self.max_workers = max_workers
+        self.entries = None
+        self.modified = False
+
+    def get_entries(self) -> dict:
+
+        if self.entries is None:
+            self.entries = {}
+            if (self.cache_file is not None) and Path(self.cache_file).is_file():
+                try:
+                    with open(self.cache_file, "rb") as f:
+                        self.entries = pickle.load(f)
+                except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+                    self.entries = {}
+
+        return self.entries
+
+    def load(self,
+        name: str,
+        paths: Mapping,
+        loader: Callable,
+        key: str = None,
+    ) -> dict:
+
+        key = get_loader_key(name, loader, key)
+        cached = self.get_entries().get(key, {})
+
+        def _load(items: list) -> list:
+            loaded = []
+            for idx, path in items:
+                try:
+                    signature = get_signature(path)
+                except OSError:
+                    continue
+                entry = cached.get(idx)
+                if (entry is not None) and (entry[0] == path) and (entry[1] == signature):
+                    loaded.append((idx, entry, False))
+                else:
+                    loaded.append((idx, (path, signature, loader(path)), True))
+            return loaded
+
+        # Datasets without output are ignored
+        items = [(idx, str(path)) for idx, path in paths.items() if path is not None]
+        if (self.max_workers <= 1) or (len(items) < 2 * self.max_workers):
+            results = _load(items)
+        else:
+            results = []
+            nb_chunks = self.max_workers * 4
+            chunks = [items[i::nb_chunks] for i in range(nb_chunks)]
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for loaded in pool.map(_load, chunks):
+                    results += loaded
+
+        # Only the current datasets are kept in cache
+        entries = {idx: entry for idx, entry, _ in results}
+        if any(changed for _, _, changed in results) or (set(entries) != set(cached)):
+            self.entries[key] = entries
+            self.modified = True
+
+        return {idx: entries[idx][2] for idx, _ in items if idx in entries}
+
+    def save(self) -> None:
+
+        if (self.cache_file is None) or (not self.modified):
+            return
+
+        # Written at once (a partial file is never read)
+        tmp_file = Path(f"{self.cache_file}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_file, "wb") as f:
+            pickle.dump(self.entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, self.cache_file)
+        self.modified = False
@@ -20,6 +20,9 @@ class Application:
         config_path: Path = CONFIG_PATH,
         workflow: list = [],
         silent: bool = False,
+        chdir: bool = True,
+        shard: bool = False,
+        background_delete: bool = True,
     ) -> None:
         
         self.workflow = WorkFlow(
@@ -27,8 +30,13 @@ class Application:
             config_path=config_path,
             workflow=workflow,
             silent=silent,
+            chdir=chdir,
+            shard=shard,
+            background_delete=background_delete,
         )
 
+        self.workflow.introspect_processes()
+
         self.workflow.print_logo()
         self.workflow.print_application()
 
@@ -60,12 +68,37 @@ class Application:
 
     def settings(self) -> None:
 
-        self.workflow.set_inputs()
-        self.workflow.test_inputs_settings()
+        # Validated inputs are restored if nothing changed since last launch
+        restored = self.workflow.load_settings_snapshot()
+        if not restored:
+            self.workflow.set_inputs()
+            self.workflow.test_inputs_settings()
+
         self.workflow.print_inputs_settings()
+        if not restored:
+            self.workflow.save_settings_snapshot()
 
         self.workflow.init_paths()
+        self.workflow.invalidate_datasets()
+
+    def __call__(self,
+        jobs: int = 1,
+        pipeline: bool = False,
+        incremental: bool = False,
+        cache: bool = False,
+        cache_size: int = None,
+        resume: bool = False,
+    ) -> None:
+
+        self.workflow(
+            jobs=jobs,
+            pipeline=pipeline,
+            incremental=incremental,
+            cache=cache,
+            cache_size=cache_size,
+            resume=resume,
+        )
 
-    def __call__(self) -> None:
+    def wait_deletions(self) -> None:
 
-        self.workflow()
+        self.workflow.wait_deletions()
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+
+def link_or_copy(
+    src: Path,
+    dst: Path,
+) -> None:
+
+    # Hardlink files (copy across filesystems), recursively for directories
+    if Path(src).is_dir():
+        shutil.copytree(src, dst, copy_function=link_or_copy)
+        return
+
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def is_linked(
+    path: Path,
+) -> bool:
+
+    # Files shared with another path (cache entry), recursively for directories
+    path = Path(path)
+    if path.is_symlink() or (not path.exists()):
+        return False
+    if not path.is_dir():
+        return path.stat().st_nlink > 1
+
+    for root, _, files in os.walk(path):
+        for file in files:
+            if os.lstat(os.path.join(root, file)).st_nlink > 1:
+                return True
+
+    return False
+
+
+def get_size(
+    path: Path,
+) -> int:
+
+    # Disk usage (apparent size where blocks are not available)
+    def _usage(p: Path) -> int:
+        stat = p.stat()
+        blocks = getattr(stat, "st_blocks", None)
+        if blocks is None:
+            return stat.st_size
+        return blocks * 512
+
+    path = Path(path)
+    return _usage(path) + sum(_usage(p) for p in path.rglob("*"))
+
+
+class OutputCache:
+    """
+    Content-addressable store of process outputs, shared by all studies.
+    Entries are keyed by process name and by the hash of the process inputs
+    and are materialized into the study tree by hardlink. The least recently
+    used entries are evicted beyond max_size (in bytes).
+    """
+
+    def __init__(self,
+        cache_dir: Path,
+        max_size: int = None,
+    ) -> None:
+
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+
+    def get_entry(self,
+        name: str,
+        key: str,
+    ) -> Path:
+
+        return self.cache_dir / name / key
+
+    def fetch(self,
+        name: str,
+        key: str,
+        outputs: dict,
+    ) -> bool:
+
+        entry = self.get_entry(name, key)
+        if not entry.is_dir():
+            return False
+        if not all((entry / out).exists() for out in outputs):
+            return False
+
+        # Materialize outputs into the study tree
+        for out, dst in outputs.items():
+            dst = Path(dst)
+            if dst.is_dir():
+                shutil.rmtree(dst)
+            elif dst.exists():
+                dst.unlink()
+            link_or_copy(entry / out, dst)
+
+        # Mark entry as recently used
+        now = time.time()
+        os.utime(entry, (now, now))
+
+        return True
+
+    def store(self,
+        name: str,
+        key: str,
+        outputs: dict,
+    ) -> None:
+
+        entry = self.get_entry(name, key)
+        if entry.exists():
+            return
+        if not all(Path(src).exists() for src in outputs.values()):
+            return
+
+        # Move outputs in a temporary folder renamed at once (concurrent workers)
+        # and hardlink them back, as when restored (copied across filesystems)
+        tmp_entry = self.cache_dir / name / f".{key}.{uuid.uuid4().hex}"
+        tmp_entry.mkdir(parents=True)
+        for out, src in outputs.items():
+            try:
+                os.replace(src, tmp_entry / out)
+            except OSError:
+                if Path(src).is_dir():
+                    shutil.copytree(src, tmp_entry / out)
+                else:
+                    shutil.copy2(src, tmp_entry / out)
+                continue
+            link_or_copy(tmp_entry / out, src)
+
+        try:
+            tmp_entry.rename(entry)
+        except OSError:
+            shutil.rmtree(tmp_entry)
+
+    def evict(self) -> None:
+
+        if (self.max_size is None) or (not self.cache_dir.exists()):
+            return
+
+        entries = []
+        for folder in self.cache_dir.iterdir():
+            if folder.is_dir():
+                entries += [e for e in folder.iterdir() if e.is_dir() and not e.name.startswith(".")]
+
+        # Remove least recently used entries first
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        sizes = [get_size(e) for e in entries]
+        total = sum(sizes)
+        for entry, size in zip(entries, sizes):
+            if total <= self.max_size:
+                break
+            shutil.rmtree(entry)
+            total -= size
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+
+class Journal:
+    """
+    Append-only record of the units completed during a run. Each record is
+    a single json line flushed to disk (fsync) as soon as the unit is done,
+    so that an interrupted run can be resumed from its last completed unit.
+    """
+
+    def __init__(self,
+        path: Path,
+    ) -> None:
+
+        self.path = Path(path)
+        self.file = None
+
+    def open(self,
+        resume: bool = False,
+    ) -> None:
+
+        # Previous records are discarded unless the run is resumed
+        if resume and self.path.exists():
+            self.file = open(self.path, "r+")
+            self.file.truncate(self.get_valid_size())
+            self.file.seek(0, os.SEEK_END)
+        else:
+            self.file = open(self.path, "w")
+
+    def get_valid_size(self) -> int:
+
+        # Size of the complete records (a crash may leave a partial last line)
+        size = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                size += len(line)
+
+        return size
+
+    def append(self,
+        record: dict,
+    ) -> None:
+
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def read(self) -> list:
+
+        if not self.path.exists():
+            return []
+
+        records = []
+        with open(self.path) as f:
+            for line in f:
+
+                # Last record may be truncated by a crash
+                if not line.endswith("\n"):
+                    break
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+
+        return records
+
+    def close(self) -> None:
+
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def remove(self) -> None:
+
+        self.close()
+        if self.path.exists():
+            self.path.unlink()
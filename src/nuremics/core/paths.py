@@ -0,0 +1,678 @@
+from __future__ import annotations
+
+import base64
+import os
+import sqlite3
+from collections.abc import Iterator, Mapping, MutableMapping
+from pathlib import Path
+
+from .utils import get_shard
+
+# Records updated in place (rowids, hence the order of the outputs, are kept)
+UPSERT_OUTPUT = (
+    "ON CONFLICT (output) DO UPDATE SET is_case = excluded.is_case, path = excluded.path, prefix = excluded.prefix, "
+    "suffix = excluded.suffix, bitmap = excluded.bitmap, sharded = excluded.sharded"
+)
+
+
+def split_template(
+    idx: str,
+    path: str,
+) -> tuple:
+
+    # Path written as <prefix><idx><suffix>, idx being a folder of the path
+    key = os.sep + str(idx) + os.sep
+    position = path.rfind(key)
+    if position < 0:
+        return None
+
+    prefix = path[:position + 1]
+    suffix = path[position + len(key) - 1:]
+
+    # Sharded layout: <prefix><ab>/<cd>/<idx><suffix>
+    shard = os.sep.join(get_shard(idx)) + os.sep
+    if prefix.endswith(os.sep + shard):
+        return prefix[:-len(shard)], suffix, True
+
+    return prefix, suffix, False
+
+
+def encode_bitmap(
+    positions: list,
+    size: int,
+) -> bytes:
+
+    bitmap = bytearray((size + 7) // 8)
+    for position in positions:
+        bitmap[position >> 3] |= 1 << (position & 7)
+
+    return bytes(bitmap)
+
+
+def decode_bitmap(
+    bitmap: bytes,
+) -> list:
+
+    positions = []
+    for i, byte in enumerate(bitmap):
+        while byte:
+            low = byte & -byte
+            positions.append(i * 8 + low.bit_length() - 1)
+            byte ^= low
+
+    return positions
+
+
+class DatasetIndex:
+    """
+    Positions of the datasets of a study, indexing the bitmaps of the paths
+    of its outputs (shared between them). Datasets are only appended, so
+    that positions never change.
+    """
+
+    def __init__(self,
+        datasets: list = (),
+    ) -> None:
+
+        self.datasets = list(datasets)
+        self.positions = {idx: i for i, idx in enumerate(self.datasets)}
+
+    def get(self,
+        idx: str,
+    ) -> int:
+
+        return self.positions.get(idx)
+
+    def add(self,
+        idx: str,
+    ) -> int:
+
+        position = self.positions.get(idx)
+        if position is None:
+            position = len(self.datasets)
+            self.positions[idx] = position
+            self.datasets.append(idx)
+
+        return position
+
+    def __len__(self) -> int:
+
+        return len(self.datasets)
+
+
+class OutputPaths(MutableMapping):
+    """
+    Paths of an output by dataset. Paths are stored once as a template
+    (<prefix><idx><suffix>, or <prefix><ab>/<cd>/<idx><suffix> in the
+    sharded layout) with a bitmap of the datasets following it (over an
+    index of datasets, shared by the outputs of a study) and derived on
+    demand; other paths are stored as they are.
+    """
+
+    def __init__(self,
+        prefix: str = None,
+        suffix: str = None,
+        sharded: bool = False,
+        index: DatasetIndex = None,
+    ) -> None:
+
+        self.prefix = prefix
+        self.suffix = suffix
+        self.sharded = sharded
+        self.index = DatasetIndex() if index is None else index
+        self.bitmap = bytearray()
+        self.nb_template = 0
+        self.overrides = {}
+
+    @classmethod
+    def from_dict(cls,
+        paths: Mapping,
+        index: DatasetIndex = None,
+    ) -> OutputPaths:
+
+        output_paths = cls(index=index)
+        output_paths.update(paths)
+
+        return output_paths
+
+    def get_template_path(self,
+        idx: str,
+    ) -> str:
+
+        if self.sharded:
+            first, second = get_shard(idx)
+            return f"{self.prefix}{first}{os.sep}{second}{os.sep}{idx}{self.suffix}"
+
+        return f"{self.prefix}{idx}{self.suffix}"
+
+    def is_template(self,
+        idx: str,
+    ) -> bool:
+
+        position = self.index.get(idx)
+        if (position is None) or (position >> 3 >= len(self.bitmap)):
+            return False
+
+        return bool((self.bitmap[position >> 3] >> (position & 7)) & 1)
+
+    def add_template(self,
+        idx: str,
+    ) -> None:
+
+        self.overrides.pop(idx, None)
+        if self.is_template(idx):
+            return
+
+        position = self.index.add(idx)
+        if position >> 3 >= len(self.bitmap):
+            self.bitmap.extend(bytes((position >> 3) + 1 - len(self.bitmap)))
+        self.bitmap[position >> 3] |= 1 << (position & 7)
+        self.nb_template += 1
+
+    def remove_template(self,
+        idx: str,
+    ) -> None:
+
+        if not self.is_template(idx):
+            return
+
+        position = self.index.get(idx)
+        self.bitmap[position >> 3] &= ~(1 << (position & 7))
+        self.nb_template -= 1
+
+    def __getitem__(self,
+        idx: str,
+    ) -> str:
+
+        if idx in self.overrides:
+            return self.overrides[idx]
+        if self.is_template(idx):
+            return self.get_template_path(idx)
+
+        raise KeyError(idx)
+
+    def __setitem__(self,
+        idx: str,
+        path: str,
+    ) -> None:
+
+        if isinstance(path, Path):
+            path = str(path)
+
+        # Template defined by the first path, and switched when the layout
+        # (flat or sharded) of the datasets folders changes
+        if isinstance(path, str) and ((self.prefix is None) or (path != self.get_template_path(idx))):
+            template = split_template(idx, path)
+            if (template is not None) and ((self.prefix is None) or self.is_relayout(template)):
+                self.set_template(*template)
+
+        if isinstance(path, str) and (self.prefix is not None) and (path == self.get_template_path(idx)):
+            self.add_template(idx)
+        else:
+            self.remove_template(idx)
+            self.overrides[idx] = path
+
+    def __delitem__(self,
+        idx: str,
+    ) -> None:
+
+        if idx in self.overrides:
+            del self.overrides[idx]
+        elif self.is_template(idx):
+            self.remove_template(idx)
+        else:
+            raise KeyError(idx)
+
+    def __iter__(self) -> Iterator[str]:
+
+        for position in decode_bitmap(bytes(self.bitmap)):
+            yield self.index.datasets[position]
+        yield from list(self.overrides)
+
+    def __len__(self) -> int:
+
+        return self.nb_template + len(self.overrides)
+
+    def __contains__(self,
+        idx: object,
+    ) -> bool:
+
+        return (idx in self.overrides) or self.is_template(idx)
+
+    def __repr__(self) -> str:
+
+        return f"OutputPaths({dict(self)!r})"
+
+    def is_relayout(self,
+        template: tuple,
+    ) -> bool:
+
+        return (template[0], template[1]) == (self.prefix, self.suffix) and (template[2] != self.sharded)
+
+    def set_template(self,
+        prefix: str,
+        suffix: str,
+        sharded: bool,
+    ) -> None:
+
+        # Paths following the previous template are kept as they are
+        for idx in self.get_template_datasets():
+            self.overrides[idx] = self.get_template_path(idx)
+        self.bitmap = bytearray()
+        self.nb_template = 0
+
+        self.prefix = prefix
+        self.suffix = suffix
+        self.sharded = sharded
+
+    def set_bitmap(self,
+        bitmap: bytes,
+    ) -> None:
+
+        # Datasets following the template, by position in the index
+        self.bitmap = bytearray(bitmap)
+        self.nb_template = bin(int.from_bytes(self.bitmap, "little")).count("1")
+
+    def get_template_datasets(self) -> list:
+
+        return [self.index.datasets[position] for position in decode_bitmap(bytes(self.bitmap))]
+
+    def get_overrides(self) -> dict:
+
+        return dict(self.overrides)
+
+
+def is_compact_paths(
+    data: Mapping,
+) -> bool:
+
+    # Compact form of the paths json file (legacy files map outputs to paths)
+    return isinstance(data.get("datasets"), list) and isinstance(data.get("outputs"), dict)
+
+
+def encode_paths(
+    dict_paths: Mapping,
+) -> dict:
+    """
+    Compact json form of the paths of a study: the datasets indexing the
+    bitmaps, then by output either its path (process which is not a case)
+    or its template, the bitmap of the datasets following it (base64) and
+    the paths of the other datasets.
+    """
+
+    # Index of the first output, shared by the others in general
+    index = None
+    for value in dict_paths.values():
+        if isinstance(value, OutputPaths):
+            index = DatasetIndex(value.index.datasets)
+            break
+    if index is None:
+        index = DatasetIndex()
+
+    outputs = {}
+    for output, value in dict_paths.items():
+
+        if not isinstance(value, Mapping):
+            outputs[output] = value
+            continue
+
+        if not isinstance(value, OutputPaths):
+            value = OutputPaths.from_dict(value, DatasetIndex(index.datasets))
+
+        # Bitmap taken as it is over the same datasets, rebuilt otherwise
+        size = min(len(value.index), len(index))
+        if value.index.datasets[:size] == index.datasets[:size]:
+            bitmap = bytes(value.bitmap)
+            for idx in value.index.datasets[size:]:
+                index.add(idx)
+        else:
+            bitmap = encode_bitmap([index.add(idx) for idx in value.get_template_datasets()], len(index))
+
+        outputs[output] = {
+            "prefix": value.prefix,
+            "suffix": value.suffix,
+            "sharded": value.sharded,
+            "bitmap": base64.b64encode(bitmap).decode(),
+            "overrides": value.get_overrides(),
+        }
+
+    return {"datasets": index.datasets, "outputs": outputs}
+
+
+def decode_paths(
+    data: Mapping,
+    index: DatasetIndex = None,
+) -> dict:
+
+    # Paths json file of previous versions (one path by dataset)
+    if not is_compact_paths(data):
+        index = DatasetIndex() if index is None else index
+        return {k: OutputPaths.from_dict(v, index) if isinstance(v, Mapping) else v for k, v in data.items()}
+
+    # Bitmaps are used as they are when datasets are indexed the same way
+    datasets = data["datasets"]
+    if index is None:
+        index = DatasetIndex(datasets)
+    stored = index.datasets[:len(datasets)] == datasets
+
+    dict_paths = {}
+    for output, value in data["outputs"].items():
+
+        if not isinstance(value, Mapping):
+            dict_paths[output] = value
+            continue
+
+        output_paths = OutputPaths(value["prefix"], value["suffix"], value["sharded"], index)
+        bitmap = base64.b64decode(value["bitmap"])
+        if stored:
+            output_paths.set_bitmap(bitmap)
+        else:
+            for position in decode_bitmap(bitmap):
+                output_paths.add_template(datasets[position])
+        output_paths.overrides.update(value["overrides"])
+
+        dict_paths[output] = output_paths
+
+    return dict_paths
+
+
+class PathStore:
+    """
+    Output paths of a study stored in a SQLite database. Paths by dataset
+    are stored in compact form: the template of the output, a bitmap of the
+    datasets following it (over the datasets of the study) and the paths of
+    the other datasets. Records are updated one unit at a time and can be
+    loaded for a subset of outputs and/or datasets.
+    """
+
+    def __init__(self,
+        path: Path,
+    ) -> None:
+
+        self.path = Path(path)
+        self.connection = None
+        self.datasets = None
+        self.positions = None
+
+    def connect(self) -> sqlite3.Connection:
+
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, timeout=60)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS outputs ("
+                "output TEXT PRIMARY KEY, is_case INTEGER NOT NULL, path TEXT, "
+                "prefix TEXT, suffix TEXT, bitmap BLOB, sharded INTEGER)"
+            )
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(outputs)")]
+            if "sharded" not in columns:
+                self.connection.execute("ALTER TABLE outputs ADD COLUMN sharded INTEGER")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS overrides ("
+                "output TEXT NOT NULL, dataset TEXT NOT NULL, path TEXT, "
+                "PRIMARY KEY (output, dataset))"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS datasets ("
+                "position INTEGER PRIMARY KEY, dataset TEXT NOT NULL)"
+            )
+            self.connection.commit()
+
+        return self.connection
+
+    def exists(self) -> bool:
+
+        return self.path.exists()
+
+    def get_datasets(self) -> list:
+
+        # Datasets indexing the bitmaps
+        if self.datasets is None:
+            rows = self.connect().execute("SELECT dataset FROM datasets ORDER BY position").fetchall()
+            self.datasets = [row[0] for row in rows]
+            self.positions = {idx: i for i, idx in enumerate(self.datasets)}
+
+        return self.datasets
+
+    def set_datasets(self,
+        datasets: list,
+    ) -> bool:
+
+        previous = self.get_datasets()
+        if previous == list(datasets):
+            return False
+
+        # Bitmaps are remapped over the new datasets, paths of removed datasets are dropped
+        positions = {idx: i for i, idx in enumerate(datasets)}
+        mapping = [positions.get(idx) for idx in previous]
+        connection = self.connect()
+        with connection:
+            for output, bitmap in connection.execute("SELECT output, bitmap FROM outputs WHERE is_case = 1").fetchall():
+                remapped = [mapping[position] for position in decode_bitmap(bitmap or b"") if (position < len(mapping)) and (mapping[position] is not None)]
+                connection.execute("UPDATE outputs SET bitmap = ? WHERE output = ?", (encode_bitmap(remapped, len(datasets)), output))
+            connection.execute("DELETE FROM datasets")
+            connection.executemany("INSERT INTO datasets VALUES (?, ?)", list(enumerate(datasets)))
+            connection.execute("DELETE FROM overrides WHERE dataset NOT IN (SELECT dataset FROM datasets)")
+        self.datasets = list(datasets)
+        self.positions = positions
+
+        return True
+
+    def load(self,
+        outputs: list = None,
+        datasets: list = None,
+        index: DatasetIndex = None,
+    ) -> dict:
+
+        connection = self.connect()
+        all_datasets = self.get_datasets()
+
+        # Index of the datasets shared by the loaded outputs (bitmaps are then used as they are stored)
+        if index is None:
+            index = DatasetIndex(all_datasets if datasets is None else datasets)
+        stored = index.datasets[:len(all_datasets)] == all_datasets
+
+        # Outputs (all of them by default)
+        query = "SELECT output, is_case, path, prefix, suffix, bitmap, sharded FROM outputs"
+        if outputs is None:
+            rows = connection.execute(query + " ORDER BY rowid").fetchall()
+        else:
+            rows = []
+            for output in outputs:
+                rows += connection.execute(query + " WHERE output = ?", (output,)).fetchall()
+
+        dict_paths = {}
+        for output, is_case, path, prefix, suffix, bitmap, sharded in rows:
+
+            if not is_case:
+                dict_paths[output] = path
+                continue
+
+            output_paths = OutputPaths(prefix, suffix, bool(sharded), index)
+            bitmap = bitmap or b""
+
+            # Datasets (all of them by default)
+            if datasets is None:
+                if stored:
+                    output_paths.set_bitmap(bitmap)
+                else:
+                    for position in decode_bitmap(bitmap):
+                        output_paths.add_template(all_datasets[position])
+                overrides = connection.execute("SELECT dataset, path FROM overrides WHERE output = ? ORDER BY rowid", (output,)).fetchall()
+            else:
+                overrides = []
+                for idx in datasets:
+                    position = self.positions.get(idx)
+                    if (position is not None) and (position >> 3 < len(bitmap)) and (bitmap[position >> 3] >> (position & 7)) & 1:
+                        output_paths.add_template(idx)
+                    else:
+                        overrides += connection.execute("SELECT dataset, path FROM overrides WHERE output = ? AND dataset = ?", (output, idx)).fetchall()
+
+            for idx, value in overrides:
+                output_paths.overrides[idx] = value
+
+            dict_paths[output] = output_paths
+
+        return dict_paths
+
+    def save(self,
+        dict_paths: dict,
+    ) -> None:
+
+        # Replace all records
+        connection = self.connect()
+        with connection:
+            connection.execute("DELETE FROM outputs")
+            connection.execute("DELETE FROM overrides")
+            for output, value in dict_paths.items():
+                self.set_output(output, value)
+
+    def update(self,
+        dict_paths: dict,
+    ) -> bool:
+
+        # Update given outputs / datasets only (None for a process which is not a case)
+        changed = False
+        connection = self.connect()
+        with connection:
+            for output, value in dict_paths.items():
+                if isinstance(value, Mapping):
+                    changed |= self.update_datasets(output, value)
+                else:
+                    changed |= self.set_output(output, value)
+
+        return changed
+
+    def delete_datasets(self,
+        removed: dict,
+    ) -> None:
+
+        # Paths of the given datasets removed (by output), other records being kept
+        connection = self.connect()
+        self.get_datasets()
+        with connection:
+            for output, datasets in removed.items():
+
+                row = connection.execute("SELECT bitmap FROM outputs WHERE output = ? AND is_case = 1", (output,)).fetchone()
+                if row is None:
+                    continue
+
+                bitmap = bytearray(row[0] or b"")
+                for idx in datasets:
+                    position = self.positions.get(idx)
+                    if (position is not None) and (position >> 3 < len(bitmap)):
+                        bitmap[position >> 3] &= ~(1 << (position & 7))
+
+                connection.executemany("DELETE FROM overrides WHERE output = ? AND dataset = ?", [(output, idx) for idx in datasets])
+                connection.execute("UPDATE outputs SET bitmap = ? WHERE output = ?", (bytes(bitmap), output))
+
+    def update_datasets(self,
+        output: str,
+        paths: Mapping,
+    ) -> bool:
+
+        connection = self.connect()
+        self.get_datasets()
+
+        row = connection.execute("SELECT is_case, prefix, suffix, bitmap, sharded FROM outputs WHERE output = ?", (output,)).fetchone()
+        changed = (row is None) or (not row[0])
+        if changed:
+            output_paths = OutputPaths()
+            bitmap = bytearray((len(self.datasets) + 7) // 8)
+        else:
+            output_paths = OutputPaths(row[1], row[2], bool(row[4]))
+            bitmap = bytearray(row[3] or b"")
+            bitmap.extend(bytes((len(self.datasets) + 7) // 8 - len(bitmap)))
+
+            # Layout changed: whole output rewritten with the new template
+            for idx, path in paths.items():
+                if isinstance(path, (str, Path)) and output_paths.is_relayout(split_template(idx, str(path)) or (None, None, None)):
+                    output_paths = self.load([output])[output]
+                    output_paths.update(paths)
+                    return self.set_output(output, output_paths)
+
+        # Records left untouched when the paths are already stored
+        for idx, path in paths.items():
+
+            output_paths[idx] = path
+            position = self.positions.get(idx)
+            if output_paths.is_template(idx) and (position is not None):
+                changed |= not (bitmap[position >> 3] >> (position & 7)) & 1
+                bitmap[position >> 3] |= 1 << (position & 7)
+                cursor = connection.execute("DELETE FROM overrides WHERE output = ? AND dataset = ?", (output, idx))
+            else:
+                if position is not None:
+                    changed |= (bitmap[position >> 3] >> (position & 7)) & 1
+                    bitmap[position >> 3] &= ~(1 << (position & 7))
+                cursor = connection.execute(
+                    "INSERT INTO overrides VALUES (?, ?, ?) ON CONFLICT (output, dataset) DO UPDATE SET path = excluded.path "
+                    "WHERE path IS NOT excluded.path",
+                    (output, idx, path),
+                )
+            changed |= cursor.rowcount > 0
+
+        if changed:
+            connection.execute(
+                "INSERT INTO outputs VALUES (?, 1, NULL, ?, ?, ?, ?) " + UPSERT_OUTPUT,
+                (output, output_paths.prefix, output_paths.suffix, bytes(bitmap), int(output_paths.sharded)),
+            )
+
+        return bool(changed)
+
+    def set_output(self,
+        output: str,
+        value: object,
+    ) -> bool:
+
+        connection = self.connect()
+
+        if not isinstance(value, Mapping):
+            row = connection.execute("SELECT is_case, path FROM outputs WHERE output = ?", (output,)).fetchone()
+            if (row is not None) and (not row[0]) and (row[1] == value):
+                return False
+            connection.execute("DELETE FROM overrides WHERE output = ?", (output,))
+            connection.execute("INSERT INTO outputs VALUES (?, 0, ?, NULL, NULL, NULL, 0) " + UPSERT_OUTPUT, (output, value))
+            return True
+
+        connection.execute("DELETE FROM overrides WHERE output = ?", (output,))
+
+        if not isinstance(value, OutputPaths):
+            value = OutputPaths.from_dict(value)
+
+        # Datasets following the template, others being stored as overrides
+        self.get_datasets()
+        positions = []
+        overrides = value.get_overrides()
+        for idx in value.get_template_datasets():
+            if idx in self.positions:
+                positions.append(self.positions[idx])
+            else:
+                overrides[idx] = value[idx]
+
+        connection.execute(
+            "INSERT INTO outputs VALUES (?, 1, NULL, ?, ?, ?, ?) " + UPSERT_OUTPUT,
+            (output, value.prefix, value.suffix, encode_bitmap(positions, len(self.datasets)), int(value.sharded)),
+        )
+        connection.executemany(
+            "INSERT INTO overrides VALUES (?, ?, ?)",
+            [(output, idx, path) for idx, path in overrides.items()],
+        )
+
+        return True
+
+    def close(self) -> None:
+
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def remove(self) -> None:
+
+        self.close()
+        self.datasets = None
+        self.positions = None
+        for suffix in ["", "-wal", "-shm"]:
+            path = Path(f"{self.path}{suffix}")
+            if path.exists():
+                path.unlink()
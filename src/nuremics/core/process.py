@@ -1,27 +1,42 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import os
 import sys
+from collections.abc import Mapping
 from pathlib import Path
 from typing import Callable
 
 import attrs
+import numpy as np
 import pandas as pd
 from termcolor import colored
 
+from .analysis import OutputLoader, frame_values, stack_values
+from .paths import OutputPaths
 from .utils import (
     concat_lists_unique,
     convert_value,
+    existing_paths,
+    get_source_key,
+    hash_path,
 )
 
+# Source key of each process class (computed once per interpreter)
+SOURCE_KEYS = {}
+
 
 @attrs.define
 class Process:
 
+    # Datasets are executed one at a time
+    batch = False
+
     name: str = attrs.field(default=None)
     study: str = attrs.field(default=None)
     df_user_params: pd.DataFrame = attrs.field(default=None)
+    dict_records: dict = attrs.field(default=None)
     dict_user_params: dict = attrs.field(default=None)
     dict_user_paths: dict = attrs.field(default=None)
     dict_paths: dict = attrs.field(factory=dict)
@@ -47,8 +62,12 @@ class Process:
     required_paths: dict = attrs.field(factory=dict)
     silent: bool = attrs.field(default=False)
     index: str = attrs.field(default=None)
+    working_dir: Path = attrs.field(default=None)
+    chdir: bool = attrs.field(default=True)
     diagram: dict = attrs.field(default={})
     set_inputs: bool = attrs.field(default=False)
+    checked_paths: set = attrs.field(factory=set)
+    output_loader: OutputLoader = attrs.field(default=None)
 
     def initialize(self) -> None:
 
@@ -97,9 +116,10 @@ class Process:
 
     def on_params_update(self) -> None:
 
-        # Create parameters dataframe and fill with variable parameters
+        # Parameters dataframe of the process, selected from the table shared by the study
+        # (not copied under copy-on-write, read-only: inputs are read from the shared records)
         if (len(self.variable_params_proc) > 0) or (len(self.variable_paths_proc) > 0):
-            self.df_params = self.df_user_params[self.variable_params_proc].copy()
+            self.df_params = self.df_user_params[self.variable_params_proc]
 
         # There is no variable parameters / paths
         else:
@@ -110,15 +130,22 @@ class Process:
 
             # There are variable parameters / paths from previous process
             if (len(variable_params) > 0) or (len(variable_paths) > 0):
-                self.df_params = pd.DataFrame(self.df_user_params.index, columns=["ID"]).set_index("ID")
+                self.df_params = pd.DataFrame(index=self.df_user_params.index)
             # There is no variable parameter from previous process
             else:
                 self.is_case = False
 
         # Add fixed parameters to the dataframe
-        if self.is_case:
-            for param in self.fixed_params_proc:
-                self.df_params[param] = self.dict_user_params[param]
+        if self.is_case and (len(self.fixed_params_proc) > 0):
+            self.df_params = self.df_params.assign(**{param: self.dict_user_params[param] for param in self.fixed_params_proc})
+
+    def get_record(self) -> dict:
+
+        # Variable parameters of the current dataset
+        if self.dict_records is not None:
+            return self.dict_records[self.index]
+
+        return {param: convert_value(self.df_user_params.at[self.index, param]) for param in self.variable_params_proc}
 
     def update_dict_inputs(self) -> None:
 
@@ -127,9 +154,11 @@ class Process:
 
             self.dict_inputs = {}
             params_inv = {v: k for k, v in self.params.items()}
-            for param in self.df_params.columns:
-                value = convert_value(self.df_params.at[self.index, param])
-                self.dict_inputs[params_inv[param]] = value
+            record = self.get_record()
+            for param in self.variable_params_proc:
+                self.dict_inputs[params_inv[param]] = record[param]
+            for param in self.fixed_params_proc:
+                self.dict_inputs[params_inv[param]] = convert_value(self.dict_user_params[param])
         else:
             self.dict_inputs = {k: self.dict_user_params[v] for k, v in self.params.items()}
 
@@ -153,38 +182,151 @@ class Process:
         for out, value in self.overall_analysis.items():
             self.dict_inputs[out] = value
 
-        # Add output paths
+        # Add output paths (relative to the working directory, unless it is not the current one)
         for out, value in self.output_paths.items():
-            self.dict_inputs[out] = value
+            if self.chdir:
+                self.dict_inputs[out] = value
+            else:
+                self.dict_inputs[out] = str(self.get_working_dir() / value)
 
         # Write json file containing all parameters
-        with open("inputs.json", "w") as f:
+        with open(self.get_working_dir() / "inputs.json", "w") as f:
             json.dump(self.dict_inputs, f, indent=4)
 
+    def get_working_dir(self) -> Path:
+
+        if self.working_dir is None:
+            return Path.cwd()
+
+        return Path(self.working_dir)
+
+    def get_cache_key(self) -> str:
+
+        sha = hashlib.sha256()
+
+        # Source code of the process
+        cls = self.__class__
+        if cls not in SOURCE_KEYS:
+            SOURCE_KEYS[cls] = get_source_key(cls) or cls.__qualname__
+        sha.update(SOURCE_KEYS[cls].encode())
+
+        # User and hard parameters
+        params = {k: self.dict_inputs[k] for k in list(self.params) + list(self.dict_hard_params) if k in self.dict_inputs}
+        sha.update(json.dumps(params, sort_keys=True, default=str).encode())
+
+        # Content of user and required input paths
+        for key in list(self.paths.keys()) + list(self.required_paths.keys()):
+            if key in self.dict_inputs:
+                sha.update(f"{key}:{hash_path(self.dict_inputs[key])}".encode())
+
+        # Content of outputs gathered by overall analysis
+        for value in self.overall_analysis.values():
+            paths = self.dict_paths.get(value)
+            if isinstance(paths, Mapping):
+                for idx in sorted(paths):
+                    sha.update(f"{idx}:{hash_path(paths[idx])}".encode())
+            elif paths is not None:
+                sha.update(hash_path(paths).encode())
+
+        # Analysis settings (of the current dataset for a case)
+        if self.name in self.dict_analysis:
+            settings = self.dict_analysis[self.name]
+            if self.is_case:
+                settings = settings.get(self.index)
+            sha.update(json.dumps(settings, sort_keys=True, default=str).encode())
+
+        return sha.hexdigest()
+
+    def get_fingerprint(self) -> str:
+
+        # Inputs content and resolved inputs (including input and output paths)
+        sha = hashlib.sha256(self.get_cache_key().encode())
+        sha.update(json.dumps(self.dict_inputs, sort_keys=True, default=str).encode())
+
+        return sha.hexdigest()
+
+    def get_outputs(self) -> dict:
+
+        outputs = {}
+        for out in self.output_paths.values():
+            if self.is_case:
+                outputs[out] = self.dict_paths[out][self.index]
+            else:
+                outputs[out] = self.dict_paths[out]
+
+        return outputs
+
+    def outputs_exist(self) -> bool:
+
+        for out in self.output_paths.values():
+            value = self.dict_paths.get(out)
+            if self.is_case:
+                value = value.get(self.index) if isinstance(value, Mapping) else None
+            elif not isinstance(value, str):
+                value = None
+            if (value is None) or (not Path(value).exists()):
+                return False
+
+        return True
+
     def get_output_path(self,
         output_path: str,
     ) -> Path:
-        
-        # Initialize path to return
-        path = None
-
-        if isinstance(self.dict_paths[output_path], dict):
-            for key, value in self.dict_paths[output_path].items():
-                if key == self.index:
-                    path = value
+
+        paths = self.dict_paths.get(output_path)
+        if isinstance(paths, Mapping):
+            path = paths.get(self.index)
         else:
-            path = self.dict_paths[output_path]
+            path = paths
 
-        if not Path(path).exists():
+        # Paths already checked for the whole process are not checked again
+        if (path is None) or ((path not in self.checked_paths) and (not Path(path).exists())):
+            self.missing_output_path(output_path)
 
-            # Printing
-            print()
-            print(colored(f"(X) Required {output_path} is missing :", "red"))
-            print(colored("> Please execute the necessary previous process that will build it.", "red"))
+        return path
 
-            sys.exit(1)
+    def missing_output_path(self,
+        output_path: str,
+    ) -> None:
 
-        return path
+        # Printing
+        print()
+        print(colored(f"(X) Required {output_path} is missing :", "red"))
+        print(colored("> Please execute the necessary previous process that will build it.", "red"))
+
+        sys.exit(1)
+
+    def check_required_paths(self,
+        indices: list,
+    ) -> None:
+
+        # Check required paths of all datasets at once (paths already checked for the process step are skipped)
+        for output_path in self.required_paths.values():
+
+            paths = self.dict_paths.get(output_path)
+            if isinstance(paths, Mapping):
+                required = [paths.get(idx) for idx in indices]
+            else:
+                required = [paths]
+
+            required = [path for path in required if path not in self.checked_paths]
+            if len(required) == 0:
+                continue
+
+            existing = existing_paths(required)
+            if any(path not in existing for path in required):
+                self.missing_output_path(output_path)
+
+            self.checked_paths.update(existing)
+
+    def new_output_paths(self) -> OutputPaths:
+
+        # Index of the datasets shared with the other outputs of the study
+        for value in self.dict_paths.values():
+            if isinstance(value, OutputPaths):
+                return OutputPaths(index=value.index)
+
+        return OutputPaths()
 
     def update_output(self,
         output_path: str,
@@ -196,10 +338,10 @@ class Process:
 
         if self.is_case:
             if self.dict_paths[output_path] is None:
-                self.dict_paths[output_path] = {}
-            self.dict_paths[output_path][self.index] = os.path.join(os.getcwd(), dump)
+                self.dict_paths[output_path] = self.new_output_paths()
+            self.dict_paths[output_path][self.index] = os.path.join(self.get_working_dir(), dump)
         else:
-            self.dict_paths[output_path] = os.path.join(os.getcwd(), dump)
+            self.dict_paths[output_path] = os.path.join(self.get_working_dir(), dump)
 
     @staticmethod
     def analysis_function(
@@ -209,9 +351,69 @@ class Process:
         func._is_analysis = True
         return func
 
+    def get_output_loader(self) -> OutputLoader:
+
+        # Loaded outputs are cached in the process folder
+        if self.output_loader is None:
+            self.output_loader = OutputLoader(self.get_working_dir() / ".outputs.pkl")
+
+        return self.output_loader
+
+    def load_output_values(self,
+        out: str,
+        loader: Callable,
+        key: str = None,
+    ) -> dict:
+
+        output = self.dict_paths.get(out)
+        if not isinstance(output, Mapping):
+            return {}
+
+        output_loader = self.get_output_loader()
+        values = output_loader.load(out, output, loader, key)
+        output_loader.save()
+
+        return values
+
+    def load_outputs(self,
+        out: str,
+        loader: Callable,
+        params: bool = True,
+        key: str = None,
+    ) -> pd.DataFrame:
+        """
+        Loads the output of all datasets into a DataFrame indexed by dataset
+        (one column by key if the loader returns a mapping), preceded by the
+        variable parameters of the datasets. Loaded values are cached by
+        loader (see key) and output signature.
+        """
+
+        df_outputs = frame_values(out, self.load_output_values(out, loader, key))
+        if params and (self.df_user_params is not None):
+            df_params = self.df_user_params.loc[df_outputs.index, self.variable_params]
+            df_outputs = pd.concat([df_params, df_outputs], axis=1)
+
+        return df_outputs
+
+    def stack_outputs(self,
+        out: str,
+        loader: Callable,
+        key: str = None,
+    ) -> tuple:
+        """
+        Loads the output of all datasets into a single array (first axis by
+        dataset). Returns the datasets and the array.
+        """
+
+        values = self.load_output_values(out, loader, key)
+
+        return list(values), stack_values(list(values.values()))
+
     def process_output(self,
         out: str,
         func: Callable[..., None],
+        loader: Callable = None,
+        loader_key: str = None,
         **kwargs: object,
     ) -> None:
 
@@ -221,8 +423,13 @@ class Process:
 
         output = self.dict_paths[out]
         analysis = self.dict_analysis[self.name]
-        if isinstance(output, dict):
-            func(output, analysis, **kwargs)
+        if isinstance(output, Mapping):
+
+            # Outputs loaded at once (with the parameters) or paths by dataset
+            if loader is not None:
+                func(self.load_outputs(out, loader, key=loader_key), analysis, **kwargs)
+            else:
+                func(dict(output), analysis, **kwargs)
 
     def finalize(self) -> None:
 
@@ -232,4 +439,128 @@ class Process:
                 dump=value,
             )
 
-        print(colored("COMPLETED <<<", "green"))
\ No newline at end of file
+        print(colored("COMPLETED <<<", "green"))
+
+
+@attrs.define
+class BatchProcess(Process):
+    """
+    Process executed once for a chunk of datasets (batch_size datasets, all
+    of them by default) instead of once per dataset. Inputs are set as
+    columns over the datasets of the chunk (NumPy arrays of the variable
+    parameters and of the paths by dataset, scalars for the others), and
+    the outputs of all datasets are registered at once (update_outputs).
+    """
+
+    # Datasets are executed by chunks
+    batch = True
+    batch_size = None
+
+    indices: list = attrs.field(factory=list)
+    dataset_dirs: dict = attrs.field(factory=dict)
+
+    def __call__(self) -> None:
+
+        # Process which is not a case is executed as usual
+        if not self.is_case:
+            super().__call__()
+            return
+
+        # Update dictionary of columnar inputs
+        self.update_batch_inputs()
+
+        for param, value in self.dict_inputs.items():
+            setattr(self, param, value)
+
+            # Printing
+            print(colored(f"> {param} = {value}", "blue"))
+
+        # Printing
+        print(colored(">>> START", "green"))
+
+    def get_column(self,
+        param: str,
+    ) -> np.ndarray:
+
+        # Values of a variable parameter for the datasets of the chunk
+        column = self.df_user_params[param]
+        if len(self.indices) != len(column):
+            column = column.loc[self.indices]
+        values = column.to_numpy()
+
+        # Object columns (mixed types) are converted value by value
+        if values.dtype == object:
+            values = np.array([convert_value(value) for value in values])
+
+        return values
+
+    def update_batch_inputs(self) -> None:
+
+        self.dict_inputs = {}
+
+        # Add user parameters
+        params_inv = {v: k for k, v in self.params.items()}
+        for param in self.variable_params_proc:
+            self.dict_inputs[params_inv[param]] = self.get_column(param)
+        for param in self.fixed_params_proc:
+            self.dict_inputs[params_inv[param]] = convert_value(self.dict_user_params[param])
+
+        # Add hard parameters
+        for param, value in self.dict_hard_params.items():
+            self.dict_inputs[param] = value
+
+        # Add user paths
+        paths_inv = {v: k for k, v in self.paths.items()}
+        for file in self.fixed_paths_proc:
+            self.dict_inputs[paths_inv[file]] = self.dict_user_paths[file]
+        for file in self.variable_paths_proc:
+            paths = self.dict_user_paths[file]
+            self.dict_inputs[paths_inv[file]] = np.array([paths[idx] for idx in self.indices])
+
+        # Add previous output paths (checked for the whole chunk beforehand)
+        for key, value in self.required_paths.items():
+            paths = self.dict_paths.get(value)
+            if isinstance(paths, Mapping):
+                self.dict_inputs[key] = np.array([paths.get(idx) for idx in self.indices])
+            else:
+                self.dict_inputs[key] = paths
+
+        # Add output analysis
+        for out, value in self.overall_analysis.items():
+            self.dict_inputs[out] = value
+
+        # Add output paths
+        for out, value in self.output_paths.items():
+            self.dict_inputs[out] = np.array([os.path.join(self.dataset_dirs[idx], value) for idx in self.indices])
+
+    def update_outputs(self,
+        output_path: str,
+        dumps: object,
+    ) -> None:
+
+        # Paths of an output for all datasets of the chunk, given by dataset
+        # or in the order of the datasets (relative to the dataset folders)
+        if not isinstance(dumps, Mapping):
+            dumps = dict(zip(self.indices, dumps))
+
+        paths = self.dict_paths.get(output_path)
+        if not isinstance(paths, Mapping):
+            paths = self.new_output_paths()
+            self.dict_paths[output_path] = paths
+
+        for idx, dump in dumps.items():
+            paths[idx] = os.path.join(self.dataset_dirs[idx], dump)
+
+    def finalize(self) -> None:
+
+        if not self.is_case:
+            super().finalize()
+            return
+
+        for _, value in self.output_paths.items():
+            self.update_outputs(
+                output_path=value,
+                dumps=[value] * len(self.indices),
+            )
+
+        print(colored("COMPLETED <<<", "green"))
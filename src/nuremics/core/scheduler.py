@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import heapq
+from pathlib import Path
+
+from termcolor import colored
+
+from .cache import OutputCache, is_linked
+from .paths import PathStore
+from .process import Process
+from .trash import Trash, delete_path
+from .utils import get_dataset_path, working_directory
+
+
+def run_unit(
+    process: Process,
+    idx: str,
+    working_dir: Path,
+    chdir: bool = True,
+    fingerprint: str = None,
+    incremental: bool = False,
+    cache: OutputCache = None,
+    trash: Trash = None,
+) -> dict:
+
+    # Printing
+    print()
+    if idx is None:
+        print(
+            colored(f"| {process.study} | {process.name} |", "magenta"),
+        )
+    else:
+        print(
+            colored(f"| {process.study} | {process.name} | {idx} |", "magenta"),
+        )
+
+    # Update process index and working directory
+    working_dir.mkdir(exist_ok=True, parents=True)
+    process.index = idx
+    process.working_dir = working_dir
+    process.chdir = chdir
+
+    # Resolve inputs once (execution then reuses them)
+    set_inputs = process.set_inputs
+    if (incremental or (cache is not None)) and (not set_inputs):
+        process.update_dict_inputs()
+        process.set_inputs = True
+
+    # Skip unit if nothing changed since its last execution
+    new_fingerprint = None
+    if incremental:
+
+        new_fingerprint = process.get_fingerprint()
+        if (new_fingerprint == fingerprint) and process.outputs_exist():
+
+            # Printing
+            print()
+            print(colored("(!) Outputs are up to date.", "yellow"))
+
+            process.set_inputs = set_inputs
+
+            return {
+                "paths": process.get_outputs(),
+                "fingerprint": new_fingerprint,
+            }
+
+    # Restore outputs computed with the same inputs (in any study)
+    outputs = {out: working_dir / out for out in process.output_paths.values()}
+    if cache is not None:
+
+        key = process.get_cache_key()
+        if cache.fetch(process.name, key, outputs):
+
+            # Printing
+            print()
+            print(colored("(!) Outputs are restored from cache.", "yellow"))
+
+            for out in outputs:
+                process.update_output(out, out)
+
+            process.set_inputs = set_inputs
+
+            return {
+                "paths": process.get_outputs(),
+                "fingerprint": new_fingerprint,
+            }
+
+    # Previous outputs hardlinked to a cache entry (restored or stored by an earlier
+    # run with cache) must not be written in place, whatever the current cache setting
+    for output in outputs.values():
+        if is_linked(output):
+            if trash is None:
+                delete_path(output)
+            else:
+                trash.remove(output)
+
+    # Launch process
+    with working_directory(working_dir, chdir):
+        process()
+        process.finalize()
+
+    if cache is not None:
+        cache.store(process.name, key, outputs)
+
+    process.set_inputs = set_inputs
+
+    return {
+        "paths": process.get_outputs(),
+        "fingerprint": new_fingerprint,
+    }
+
+
+def run_batch(
+    process: Process,
+    indices: list,
+    folder_path: Path,
+    chdir: bool = True,
+    shard: bool = False,
+) -> dict:
+
+    # Printing
+    print()
+    print(
+        colored(f"| {process.study} | {process.name} | {len(indices)} dataset(s) |", "magenta"),
+    )
+
+    # Folders of the datasets (outputs are written by the process in a single call)
+    process.dataset_dirs = {}
+    for idx in indices:
+        working_dir = get_dataset_path(folder_path, idx, shard)
+        working_dir.mkdir(exist_ok=True, parents=True)
+        process.dataset_dirs[idx] = working_dir
+
+    process.index = None
+    process.indices = list(indices)
+    process.working_dir = folder_path
+    process.chdir = chdir
+
+    # Launch process
+    with working_directory(folder_path, chdir):
+        process()
+        process.finalize()
+
+    outputs = list(process.output_paths.values())
+    return {
+        idx: {
+            "paths": {out: process.dict_paths[out][idx] for out in outputs},
+            "fingerprint": None,
+        } for idx in indices
+    }
+
+
+def run_process(
+    process: Process,
+    indices: list,
+    folder_path: Path,
+    chdir: bool = True,
+    fingerprints: dict = {},
+    incremental: bool = False,
+    cache: OutputCache = None,
+    shard: bool = False,
+    trash: Trash = None,
+) -> dict:
+
+    # Inputs produced by previous processes are checked once for all datasets
+    process.check_required_paths(indices)
+
+    # Datasets executed at once (no incremental skipping nor cache by dataset)
+    if process.batch and process.is_case:
+        return run_batch(process, indices, folder_path, chdir, shard)
+
+    # Results of each dataset (None for a process which is not a case)
+    results = {}
+    for idx in indices:
+
+        if idx is None:
+            working_dir = folder_path
+        else:
+            working_dir = get_dataset_path(folder_path, idx, shard)
+
+        results[idx] = run_unit(process, idx, working_dir, chdir, fingerprints.get(idx), incremental, cache, trash)
+
+    return results
+
+
+def run_process_worker(
+    process_class: type,
+    process_kwargs: dict,
+    indices: list,
+    folder_path: Path,
+    chdir: bool = True,
+    fingerprints: dict = {},
+    incremental: bool = False,
+    cache: OutputCache = None,
+    paths_db: Path = None,
+    shard: bool = False,
+    trash: Trash = None,
+) -> dict:
+
+    # Load the paths used by the process for these datasets only
+    if paths_db is not None:
+        store = PathStore(paths_db)
+        outputs = list(process_kwargs["required_paths"].values()) + list(process_kwargs["output_paths"].values())
+        dict_paths = store.load(outputs, [idx for idx in indices if idx is not None])
+        dict_paths.update(store.load(list(process_kwargs["overall_analysis"].values())))
+        store.close()
+        process_kwargs = {**process_kwargs, "dict_paths": dict_paths}
+
+    # Rebuild process in the worker (attrs instances with unset fields cannot be pickled)
+    process: Process = process_class(**process_kwargs)
+    process.name = process_class.__name__
+    process.initialize()
+
+    return run_process(process, indices, folder_path, chdir, fingerprints, incremental, cache, shard, trash)
+
+
+class Scheduler:
+    """
+    Dependency graph of execution units. Work units are handed out as soon
+    as all their dependencies are completed, by priority and then in the
+    order they were added. Barrier units carry no work and complete with
+    their last dependency. In fair mode, ready units are handed out in turn
+    from each group (first element of the unit, i.e. the study).
+    """
+
+    def __init__(self,
+        fair: bool = False,
+    ) -> None:
+
+        self.fair = fair
+        self.order = {}
+        self.priority = {}
+        self.barriers = set()
+        self.waiting = {}
+        self.dependents = {}
+        self.ready = {}
+        self.completed = set()
+        self.nb_pending = 0
+
+    def add(self,
+        unit: tuple,
+        dependencies: list,
+        barrier: bool = False,
+        priority: object = 0,
+    ) -> None:
+
+        self.order[unit] = len(self.order)
+        self.priority[unit] = priority
+        self.dependents[unit] = []
+        self.nb_pending += 1
+        if barrier:
+            self.barriers.add(unit)
+
+        # Dependencies must be added first
+        waiting = 0
+        for dependency in dependencies:
+            if dependency not in self.completed:
+                self.dependents[dependency].append(unit)
+                waiting += 1
+        self.waiting[unit] = waiting
+
+    def start(self) -> list:
+
+        # Release units without pending dependencies
+        completed = []
+        for unit, waiting in list(self.waiting.items()):
+            if waiting == 0 and unit not in self.completed:
+                completed += self.release(unit)
+
+        return completed
+
+    def release(self,
+        unit: tuple,
+    ) -> list:
+
+        if unit in self.barriers:
+            return self.complete(unit)
+
+        if self.fair:
+            group = unit[0]
+        else:
+            group = None
+
+        heapq.heappush(self.ready.setdefault(group, []), (self.priority[unit], self.order[unit], unit))
+        return []
+
+    def nb_ready(self) -> int:
+
+        return sum(len(heap) for heap in self.ready.values())
+
+    def pop_ready(self,
+        limit: int = None,
+    ) -> list:
+
+        units = []
+        while (limit is None) or (len(units) < limit):
+
+            # Take one unit from each group in turn
+            groups = [group for group, heap in self.ready.items() if len(heap) > 0]
+            if len(groups) == 0:
+                break
+
+            for group in groups:
+                if (limit is not None) and (len(units) >= limit):
+                    break
+                units.append(heapq.heappop(self.ready[group])[2])
+
+        # Next call starts with the group following the last one served
+        if self.fair and (len(units) > 0):
+            groups = list(self.ready)
+            position = groups.index(units[-1][0]) + 1
+            self.ready = {group: self.ready[group] for group in groups[position:] + groups[:position]}
+
+        return units
+
+    def complete(self,
+        unit: tuple,
+    ) -> list:
+
+        # Completed barriers are returned so that the caller can react to them
+        completed = []
+        if unit in self.barriers:
+            completed.append(unit)
+
+        self.completed.add(unit)
+        self.nb_pending -= 1
+        del self.waiting[unit]
+
+        for dependent in self.dependents.pop(unit):
+            self.waiting[dependent] -= 1
+            if self.waiting[dependent] == 0:
+                completed += self.release(dependent)
+
+        return completed
+
+    def __contains__(self,
+        unit: tuple,
+    ) -> bool:
+
+        return unit in self.order
+
+    def is_finished(self) -> bool:
+
+        return self.nb_pending == 0
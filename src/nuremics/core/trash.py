@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+def delete_path(
+    path: Path,
+) -> None:
+
+    # Remove path, either file or directory
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.lexists(path):
+        os.unlink(path)
+
+
+class Trash:
+    """
+    Deletion service of a working directory. Doomed paths are renamed at
+    once into the trash folder (hence disappear from the tree immediately)
+    and deleted by a pool of background threads. Pending deletions are
+    drained on exit (the threads are joined by the interpreter) or with
+    wait(). When disabled, paths are deleted synchronously.
+    """
+
+    def __init__(self,
+        trash_dir: Path,
+        background: bool = True,
+        max_workers: int = 4,
+    ) -> None:
+
+        self.trash_dir = Path(trash_dir)
+        self.background = background
+        self.max_workers = max_workers
+        self.pool = None
+        self.futures = set()
+
+    def __getstate__(self) -> dict:
+
+        # Sent to worker processes without its threads (each one starts its own)
+        return {**self.__dict__, "pool": None, "futures": set()}
+
+    def remove(self,
+        path: Path,
+    ) -> None:
+
+        if not os.path.lexists(path):
+            return
+
+        if not self.background:
+            delete_path(path)
+            return
+
+        # Rename into the trash (paths on another filesystem are deleted at once)
+        self.trash_dir.mkdir(exist_ok=True, parents=True)
+        target = self.trash_dir / f"{uuid.uuid4().hex}-{Path(path).name}"
+        try:
+            os.replace(path, target)
+        except OSError:
+            delete_path(path)
+            return
+
+        self.submit(target)
+
+    def submit(self,
+        path: Path,
+    ) -> None:
+
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="nuremics-trash")
+
+        # Completed deletions are forgotten
+        future = self.pool.submit(delete_path, path)
+        self.futures.add(future)
+        future.add_done_callback(self.futures.discard)
+
+    def empty(self) -> None:
+
+        # Leftovers of an interrupted run
+        if not self.trash_dir.is_dir():
+            return
+
+        with os.scandir(self.trash_dir) as it:
+            paths = [Path(entry.path) for entry in it]
+
+        for path in paths:
+            if self.background:
+                self.submit(path)
+            else:
+                delete_path(path)
+
+    def wait(self) -> None:
+
+        for future in list(self.futures):
+            future.result()
+
+    def shutdown(self,
+        wait: bool = True,
+    ) -> None:
+
+        if wait:
+            self.wait()
+
+        if self.pool is not None:
+            self.pool.shutdown(wait=wait)
+            self.pool = None
@@ -1,7 +1,14 @@
 import ast
+import hashlib
 import inspect
+import json
+import os
 import textwrap
-from typing import Any, Callable, Optional, Type, Union
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Type, Union
 
 import attrs
 import numpy as np
@@ -33,18 +40,218 @@ def concat_lists_unique(
     return list(dict.fromkeys(list1 + list2))
 
 
-def get_self_method_calls(
-    cls: Type,
-    method_name: str = "__call__",
-) -> list:
-    
-    method = getattr(cls, method_name, None)
-    if method is None:
-        return []
+@contextmanager
+def working_directory(
+    path: Path,
+    chdir: bool = True,
+) -> Iterator[Path]:
+    """
+    Provides the working directory of a dataset. The process-wide current
+    directory is only changed (and restored) when chdir is True, as a
+    compatibility shim for processes writing to relative paths.
+    """
+
+    if not chdir:
+        yield path
+        return
+
+    previous_dir = os.getcwd()
+    os.chdir(path)
+    try:
+        yield path
+    finally:
+        os.chdir(previous_dir)
+
+
+def dump_json(
+    path: Path,
+    data: object,
+    default: Callable = None,
+) -> None:
+    """
+    Writes a json file atomically: data is written to a temporary file of
+    the same folder which then replaces the target file. Objects which are
+    not serializable are converted by default, one at a time while writing.
+    """
+
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=4, default=default)
+    os.replace(tmp_path, path)
+
+
+def write_if_changed(
+    path: Path,
+    text: str,
+) -> bool:
+    """
+    Writes a text file only if its content changes, so that its
+    modification time reflects actual changes.
+    """
+
+    path = Path(path)
+    if path.exists():
+        with open(path, newline="") as f:
+            if f.read() == text:
+                return False
+
+    with open(path, "w", newline="") as f:
+        f.write(text)
+
+    return True
+
+
+def hash_path(
+    path: Path,
+) -> str:
+    """
+    Hashes the content of a file, or of all files within a directory
+    (including their relative names). A missing path hashes to an empty
+    string.
+    """
+
+    path = Path(path)
+    if path.is_file():
+        files = [(path.name, path)]
+    elif path.is_dir():
+        files = sorted((p.relative_to(path).as_posix(), p) for p in path.rglob("*") if p.is_file())
+    else:
+        return ""
+
+    sha = hashlib.sha256()
+    for name, file in files:
+        sha.update(name.encode())
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+
+    return sha.hexdigest()
+
+
+def existing_paths(
+    paths: list,
+    max_workers: int = 16,
+) -> set:
+    """
+    Returns the subset of paths which exist. Paths sharing a parent folder
+    are checked with a single listing of that folder, and folders are
+    checked concurrently by chunks (stats are slow on network filesystems).
+    """
+
+    by_parent = {}
+    for path in set(str(p) for p in paths if p is not None):
+        by_parent.setdefault(os.path.dirname(path), []).append(path)
+
+    def _check(items: list) -> list:
+        found = []
+        for parent, group in items:
+            if len(group) == 1:
+                found += [p for p in group if os.path.exists(p)]
+                continue
+            try:
+                with os.scandir(parent or ".") as it:
+                    names = {entry.name for entry in it}
+            except OSError:
+                continue
+            found += [p for p in group if os.path.basename(p) in names]
+        return found
+
+    items = list(by_parent.items())
+    if (max_workers <= 1) or (len(items) < 2 * max_workers):
+        return set(_check(items))
+
+    existing = set()
+    nb_chunks = max_workers * 4
+    chunks = [items[i::nb_chunks] for i in range(nb_chunks)]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for found in pool.map(_check, chunks):
+            existing.update(found)
+
+    return existing
+
+
+def get_shard(
+    idx: str,
+) -> tuple:
+    """
+    Returns the two levels of folders holding a dataset in the sharded
+    layout (first hex digits of the hash of its name).
+    """
+
+    digest = hashlib.sha1(str(idx).encode()).hexdigest()
+
+    return digest[:2], digest[2:4]
+
+
+def get_dataset_path(
+    folder: Path,
+    idx: str,
+    shard: bool = False,
+) -> Path:
+
+    # <folder>/<idx> or <folder>/<ab>/<cd>/<idx>
+    if shard:
+        return Path(folder).joinpath(*get_shard(idx), str(idx))
+
+    return Path(folder) / str(idx)
 
-    source = inspect.getsource(method)
-    source = textwrap.dedent(source)
-    tree = ast.parse(source)
+
+def is_shard_name(
+    name: str,
+) -> bool:
+
+    return (len(name) == 2) and all(c in "0123456789abcdef" for c in name)
+
+
+def scan_dataset_dirs(
+    folder: Path,
+    datasets: set = (),
+    shard: bool = False,
+) -> tuple:
+    """
+    Lists the dataset folders of a folder, whatever their layout (flat or
+    sharded) as (dataset, folder) pairs, and the other entries. In the flat
+    layout, folders named after a dataset are never taken for shards.
+    """
+
+    found = []
+    others = []
+
+    def _scan(path: str, level: int) -> None:
+        with os.scandir(path) as it:
+            for entry in it:
+                if not entry.is_dir():
+                    others.append(entry.path)
+                elif (level < 2) and is_shard_name(entry.name) and (shard or level > 0 or entry.name not in datasets):
+                    _scan(entry.path, level + 1)
+                elif (level == 0) or (level == 2):
+                    found.append((entry.name, Path(entry.path)))
+                else:
+                    others.append(entry.path)
+
+    _scan(str(folder), 0)
+
+    return found, others
+
+
+def remove_empty_shards(
+    folder: Path,
+) -> None:
+
+    for first in Path(folder).iterdir():
+        if not (first.is_dir() and is_shard_name(first.name)):
+            continue
+        for second in first.iterdir():
+            if second.is_dir() and is_shard_name(second.name) and not any(second.iterdir()):
+                second.rmdir()
+        if not any(first.iterdir()):
+            first.rmdir()
+
+
+def find_self_method_calls(
+    tree: ast.AST,
+) -> list:
 
     called_methods = []
 
@@ -61,22 +268,10 @@ def get_self_method_calls(
     return called_methods
 
 
-# From ChatGPT
-def only_function_calls(
-    method: Callable[..., Any],
+def has_only_function_calls(
+    tree: ast.AST,
     allowed_methods: list[str],
 ) -> bool:
-    """
-    Checks that the method contains only function calls,
-    and that all calls are either super().__call__() or self.<allowed_method>().
-    """
-    
-    # Get and dedent source code
-    source = inspect.getsource(method)
-    source = textwrap.dedent(source)
-
-    # Parse the AST
-    tree = ast.parse(source)
 
     # Expect a FunctionDef node at top level
     func_def = tree.body[0]
@@ -111,37 +306,136 @@ def only_function_calls(
     return True
 
 
+def get_source_key(
+    cls: Type,
+) -> Optional[str]:
+    """
+    Hashes the source files defining a class and its __call__ method,
+    without parsing them (None if they are not available).
+    """
+
+    sha = hashlib.sha256(f"{cls.__module__}.{cls.__qualname__}".encode())
+
+    files = [inspect.getsourcefile(cls)]
+    method = getattr(cls, "__call__", None)
+    code = getattr(method, "__code__", None)
+    if code is not None:
+        files.append(code.co_filename)
+
+    for file in dict.fromkeys(files):
+        if (file is None) or (not os.path.isfile(file)):
+            return None
+        sha.update(file.encode())
+        with open(file, "rb") as f:
+            sha.update(f.read())
+
+    return sha.hexdigest()
+
+
+def introspect_process(
+    cls: Type,
+    cache: dict = None,
+) -> dict:
+    """
+    Collects the operations, inputs, outputs and analysis of a process class
+    in a single pass. The source analysis (operations and validity of the
+    __call__ method) is taken from cache when the class source is unchanged,
+    the cache holding the analysis of the current source of each class only.
+    """
+
+    if cache is None:
+        cache = {}
+
+    name = f"{cls.__module__}.{cls.__qualname__}"
+    key = get_source_key(cls)
+    entry = cache.get(name)
+    if (key is None) or (entry is None) or (entry.get("key") != key):
+        source = textwrap.dedent(inspect.getsource(cls.__call__))
+        tree = ast.parse(source)
+        operations = find_self_method_calls(tree)
+        entry = {
+            "key": key,
+            "operations": operations,
+            "valid_call": has_only_function_calls(tree, operations),
+        }
+        if key is not None:
+            cache[name] = entry
+
+    inputs = {}
+    analysis = []
+    outputs = []
+    for field in attrs.fields(cls):
+        if field.metadata.get("input", False):
+            inputs[field.name] = field.type
+        if field.metadata.get("analysis", False):
+            analysis.append(field.name)
+        if field.metadata.get("output", False):
+            outputs.append(field.name)
+
+    return {
+        "operations": list(entry["operations"]),
+        "valid_call": entry["valid_call"],
+        "inputs": inputs,
+        "analysis": analysis,
+        "outputs": outputs,
+    }
+
+
+# Deprecated helpers (single pass of introspect_process)
+def deprecated(
+    name: str,
+    replacement: str,
+) -> None:
+
+    warnings.warn(f"{name} is deprecated, use {replacement} instead.", DeprecationWarning, stacklevel=3)
+
+
+def get_self_method_calls(
+    cls: Type,
+    method_name: str = "__call__",
+) -> list:
+
+    deprecated("get_self_method_calls", "find_self_method_calls")
+
+    method = getattr(cls, method_name, None)
+    if method is None:
+        return []
+
+    return find_self_method_calls(ast.parse(textwrap.dedent(inspect.getsource(method))))
+
+
+def only_function_calls(
+    method: Callable[..., Any],
+    allowed_methods: list[str],
+) -> bool:
+
+    deprecated("only_function_calls", "has_only_function_calls")
+
+    return has_only_function_calls(ast.parse(textwrap.dedent(inspect.getsource(method))), allowed_methods)
+
+
 def extract_inputs_and_types(
     obj: object,
 ) -> dict:
-    
-    params = {}
-    for field in attrs.fields(obj.__class__):
-        if field.metadata.get("input", False):
-            params[field.name] = field.type
-    
-    return params
+
+    deprecated("extract_inputs_and_types", "introspect_process")
+
+    return introspect_process(obj.__class__)["inputs"]
 
 
 def extract_analysis(
     obj: object,
 ) -> list:
-    
-    analysis = []
-    for field in attrs.fields(obj.__class__):
-        if field.metadata.get("analysis", False):
-            analysis.append(field.name)
-    
-    return analysis
+
+    deprecated("extract_analysis", "introspect_process")
+
+    return introspect_process(obj.__class__)["analysis"]
 
 
 def extract_outputs(
     obj: object,
 ) -> list:
 
-    outputs = []
-    for field in attrs.fields(obj.__class__):
-        if field.metadata.get("output", False):
-            outputs.append(field.name)
-    
-    return outputs
+    deprecated("extract_outputs", "introspect_process")
+
+    return introspect_process(obj.__class__)["outputs"]
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import copy
+import hashlib
 import json
 import os
 import pathlib
-import shutil
+import pickle
 import sys
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from importlib.metadata import PackageNotFoundError, version
 from importlib.resources import files
 from pathlib import Path
 
@@ -12,15 +17,46 @@ import numpy as np
 import pandas as pd
 from termcolor import colored
 
+from .cache import OutputCache
+from .journal import Journal
+from .paths import DatasetIndex, OutputPaths, PathStore, decode_paths, encode_paths, is_compact_paths
 from .process import Process
+from .scheduler import Scheduler, run_process, run_process_worker
+from .trash import Trash
 from .utils import (
-    extract_analysis,
-    extract_inputs_and_types,
-    extract_outputs,
-    get_self_method_calls,
-    only_function_calls,
+    convert_value,
+    dump_json,
+    existing_paths,
+    get_dataset_path,
+    hash_path,
+    introspect_process,
+    remove_empty_shards,
+    scan_dataset_dirs,
+    write_if_changed,
 )
 
+# Version of the package (snapshots of other versions are not restored)
+try:
+    NUREMICS_VERSION = version("nuremics")
+except PackageNotFoundError:
+    NUREMICS_VERSION = None
+
+# Validated inputs restored from the settings snapshot
+SETTINGS_STATE = [
+    "dict_fixed_params",
+    "dict_variable_params",
+    "dict_records",
+    "dict_user_paths",
+    "fixed_params_messages",
+    "fixed_paths_messages",
+    "fixed_params_config",
+    "fixed_paths_config",
+    "variable_params_messages",
+    "variable_paths_messages",
+    "variable_params_config",
+    "variable_paths_config",
+]
+
 
 class WorkFlow:
 
@@ -30,6 +66,9 @@ class WorkFlow:
         config_path: Path,
         workflow: list,
         silent: bool = False,
+        chdir: bool = True,
+        shard: bool = False,
+        background_delete: bool = True,
     ) -> None:
 
         # -------------------- #
@@ -44,6 +83,8 @@ class WorkFlow:
         self.dict_studies = {}
         self.dict_process = {}
         self.dict_analysis = {}
+        self.analysis_state = {}
+        self.analysis_dirty = set()
         self.user_params = []
         self.user_paths = []
         self.output_paths = []
@@ -61,6 +102,7 @@ class WorkFlow:
         self.outputs_plug = {}
         self.analysis_plug = {}
         self.studies_modif = {}
+        self.studies_changes = {}
         self.studies_messages = {}
         self.studies_config = {}
         self.fixed_params_messages = {}
@@ -77,10 +119,28 @@ class WorkFlow:
         self.variable_paths = {}
         self.dict_fixed_params = {}
         self.dict_variable_params = {}
+        self.dict_records = {}
         self.dict_user_paths = {}
         self.dict_paths = {}
+        self.dataset_indexes = {}
+        self.paths_modified = set()
+        self.path_stores = {}
+        self.dict_fingerprints = {}
         self.diagram = {}
+        self.introspection = {}
+        self.dict_tasks = {}
+        self.checked_steps = set()
+        self.batch_units = {}
         self.silent = silent
+        self.chdir = chdir
+        self.shard = shard
+        self.background_delete = background_delete
+        self.pipeline = False
+        self.incremental = False
+        self.cache = None
+        self.journals = {}
+        self.resumed = set()
+        self.trash = None
 
         # ------------------------------------ #
         # Define and create nuremics directory #
@@ -147,6 +207,24 @@ class WorkFlow:
         for line in lines:
             print(colored(line.rstrip(), "yellow"))
 
+    def introspect_processes(self) -> None:
+
+        # Source analysis of previous launches (by process class, entries of another format are dropped)
+        cache_file = self.config_path / ".introspection.json"
+        if cache_file.exists():
+            with open(cache_file) as f:
+                previous = json.load(f)
+        else:
+            previous = {}
+        cache = {name: entry for name, entry in previous.items() if isinstance(entry, dict) and ("key" in entry)}
+
+        # Single pass over the process classes
+        for proc in self.list_workflow:
+            self.introspection[proc["process"].__name__] = introspect_process(proc["process"], cache)
+
+        if cache != previous:
+            dump_json(cache_file, cache)
+
     def print_application(self) -> None:
         
         # Printing
@@ -170,20 +248,15 @@ class WorkFlow:
         for i, proc in enumerate(self.list_workflow):
 
             proc_name = proc["process"].__name__
-            process = proc["process"]
-            this_process: Process = process()
 
             # Define number of spaces taken by the application print
             nb_spaces_proc = len(proc_name) + 10
 
             # Get list of operations for current process
-            self.operations_by_process[proc_name] = get_self_method_calls(this_process.__class__)
+            self.operations_by_process[proc_name] = self.introspection[proc_name]["operations"]
 
             # Test if process call contains only call to operations
-            valid_call = only_function_calls(
-                method=this_process.__call__,
-                allowed_methods=self.operations_by_process[proc_name],
-            )
+            valid_call = self.introspection[proc_name]["valid_call"]
 
             # Printing
             if valid_call:
@@ -239,6 +312,8 @@ class WorkFlow:
             sys.exit(1)
 
         self.working_dir = Path(self.dict_settings["apps"][self.app_name]["working_dir"]) / self.app_name
+        self.cache_dir = self.working_dir / ".cache"
+        self.trash_dir = self.working_dir / ".trash"
 
         # ------------------- #
         # Write settings file #
@@ -254,21 +329,28 @@ class WorkFlow:
             parents=True,
         )
 
-        # ----------------------- #
-        # Go to working directory #
-        # ----------------------- #
-        os.chdir(self.working_dir)
+        # ------------------------------------------------ #
+        # Start deletion service (emptying previous trash) #
+        # ------------------------------------------------ #
+        if self.trash is not None:
+            self.trash.shutdown(wait=False)
+        self.trash = Trash(self.trash_dir.resolve(), self.background_delete)
+        self.trash.empty()
+
+        # ----------------------------------------- #
+        # Go to working directory (compatibility) #
+        # ----------------------------------------- #
+        if self.chdir:
+            os.chdir(self.working_dir)
 
     def get_inputs(self) -> None:
         
         for proc in self.list_workflow:
 
-            process = proc["process"]
             name = proc["process"].__name__
-            this_process: Process = process()
 
-            self.inputs_by_process[name] = extract_inputs_and_types(this_process)
-            self.analysis_by_process[name] = extract_analysis(this_process)
+            self.inputs_by_process[name] = self.introspection[name]["inputs"]
+            self.analysis_by_process[name] = self.introspection[name]["analysis"]
 
             if "settings" in proc:
                 self.settings_by_process[name] = proc["settings"]
@@ -319,11 +401,9 @@ class WorkFlow:
         
         for proc in self.list_workflow:
 
-            process = proc["process"]
             name = proc["process"].__name__
-            this_process: Process = process()
 
-            self.outputs_by_process[name] = extract_outputs(this_process)
+            self.outputs_by_process[name] = self.introspection[name]["outputs"]
             self.outputs_plug[name] = {}
 
             for output in self.outputs_by_process[name]:
@@ -769,13 +849,22 @@ class WorkFlow:
         for study in self.studies:
 
             self.studies_modif[study] = False
+            self.studies_changes[study] = []
 
-            study_file = Path(study) / ".study.json"
+            study_file = self.working_dir / study / ".study.json"
             if study_file.exists():
                 with open(study_file) as f:
                     dict_study = json.load(f)
-                if (self.dict_studies["config"][study]["user_params"] != dict_study["user_params"]) or \
-                   (self.dict_studies["config"][study]["user_paths"] != dict_study["user_paths"]):
+
+                # List of parameters / paths whose configuration changed
+                for key in ["user_params", "user_paths"]:
+                    new_config = self.dict_studies["config"][study][key]
+                    old_config = dict_study[key]
+                    for name in list(dict.fromkeys(list(new_config) + list(old_config))):
+                        if new_config.get(name) != old_config.get(name):
+                            self.studies_changes[study].append(name)
+
+                if len(self.studies_changes[study]) > 0:
                     self.studies_modif[study] = True
 
     def test_studies_settings(self) -> None:
@@ -821,12 +910,11 @@ class WorkFlow:
                 print(
                     colored("(!) Configuration has been modified.", "yellow"),
                 )
-                self.clean_output_tree(study)
-
-                # Delete analysis file
-                path = Path(study) / "analysis.json"
-                if path.exists():
-                    path.unlink()
+                invalidated = self.invalidate_processes(study)
+                if len(invalidated) > 0:
+                    print(
+                        colored(f"(!) Outputs of {', '.join(invalidated)} are deleted.", "yellow"),
+                    )
 
             for message in self.studies_messages[study]:
                 if "(V)" in message:
@@ -837,7 +925,7 @@ class WorkFlow:
             if not self.studies_config[study]:
                 print()
                 print(colored("(X) Please configure file :", "red"))
-                print(colored(f"> {Path.cwd() / 'studies.json'}", "red"))
+                print(colored(f"> {self.studies_file}", "red"))
                 sys.exit(1)
 
     def init_process_settings(self) -> None:
@@ -846,7 +934,7 @@ class WorkFlow:
         for study in self.studies:
 
             # Open process json file if existing
-            process_file = Path(study) / "process.json"
+            process_file = self.working_dir / study / "process.json"
             if os.path.exists(process_file):
                 with open(process_file) as f:
                     self.dict_process[study] = json.load(f)
@@ -913,8 +1001,7 @@ class WorkFlow:
             )
 
             # Write study json file
-            with open(study_dir / ".study.json", "w") as f:
-                json.dump(self.dict_studies["config"][study], f, indent=4)
+            write_if_changed(study_dir / ".study.json", json.dumps(self.dict_studies["config"][study], indent=4))
 
             # Initialize inputs csv
             inputs_file: Path = study_dir / "inputs.csv"
@@ -947,10 +1034,8 @@ class WorkFlow:
                     # Set default execution
                     df_inputs["EXECUTE"] = df_inputs["EXECUTE"].fillna(1).astype(int)
 
-                    # Write input dataframe
-                    df_inputs.to_csv(
-                        path_or_buf=inputs_file,
-                    )
+                    # Write input dataframe (if modified)
+                    write_if_changed(inputs_file, df_inputs.to_csv())
 
                 # Define list of datasets
                 self.dict_datasets[study] = df_inputs.index.tolist()
@@ -1024,9 +1109,8 @@ class WorkFlow:
                     # Update inputs dictionnary
                     dict_inputs = {**dict_fixed_params, **dict_fixed_paths, **dict_variable_paths}
 
-                    # Write inputs json
-                    with open(inputs_file, "w") as f:
-                        json.dump(dict_inputs, f, indent=4)
+                    # Write inputs json (if modified)
+                    write_if_changed(inputs_file, json.dumps(dict_inputs, indent=4))
 
                 self.dict_inputs[study] = dict_inputs
 
@@ -1053,60 +1137,129 @@ class WorkFlow:
                 for path in input_paths:
                     resolved_path = path.resolve().name
                     if (resolved_path not in self.fixed_paths[study]) and (resolved_path != "0_datasets"):
-                        if Path(path).is_file():
-                            path.unlink()
-                        else:
-                            shutil.rmtree(path)
+                        self.trash.remove(path)
 
                 # Update inputs subfolders for variable paths
                 datasets_dir: Path = inputs_dir / "0_datasets"
                 if len(self.variable_paths[study]) > 0:
 
-                    # Create datasets directory (if necessary)
-                    datasets_dir.mkdir(
-                        exist_ok=True,
-                        parents=True,
-                    )
-
-                    # Create subfolders (if necessary)
-                    for index in df_inputs.index:
-
-                        inputs_subfolder: Path = datasets_dir / index
-                        inputs_subfolder.mkdir(
-                            exist_ok=True,
-                            parents=True,
-                        )
-
-                        # Delete variable paths (if necessary)
-                        input_paths = [f for f in inputs_subfolder.iterdir()]
-                        for path in input_paths:
-                            resolved_path = path.resolve().name
-                            if resolved_path not in self.variable_paths[study]:
-                                if Path(path).is_file():
-                                    path.unlink()
-                                else:
-                                    shutil.rmtree(path)
-
-                    # Delete subfolders (if necessary)
-                    inputs_subfolders = [f for f in datasets_dir.iterdir() if f.is_dir()]
-                    for folder in inputs_subfolders:
-                        id = os.path.split(folder)[-1]
-                        if id not in self.dict_datasets[study]:
-                            shutil.rmtree(folder)
+                    # Create / delete subfolders of added / removed datasets
+                    self.reconcile_datasets_tree(study, datasets_dir)
 
                 # Delete datasets folder (if necessary)
                 elif datasets_dir.exists():
-                    shutil.rmtree(datasets_dir)
+                    self.trash.remove(datasets_dir)
 
             # Delete inputs directory (if necessary)
             elif inputs_dir.exists():
-                shutil.rmtree(inputs_dir)
+                self.trash.remove(inputs_dir)
         
         # Delete useless study directories
         studies_folders = [f for f in self.working_dir.iterdir() if f.is_dir()]
         for folder in studies_folders:
-            if os.path.split(folder)[-1] not in self.studies:
-                shutil.rmtree(folder)
+            if (os.path.split(folder)[-1] not in self.studies) and (folder not in [self.cache_dir, self.trash_dir]):
+                self.trash.remove(folder)
+
+    def reconcile_datasets_tree(self,
+        study: str,
+        datasets_dir: Path,
+    ) -> None:
+
+        # Create datasets directory (if necessary)
+        datasets_dir.mkdir(
+            exist_ok=True,
+            parents=True,
+        )
+
+        # Variable paths and layout at the last reconciliation (flat before sharding existed)
+        state_file = datasets_dir / ".tree.json"
+        if state_file.exists():
+            with open(state_file) as f:
+                state = json.load(f)
+            previous_paths = state["variable_paths"]
+            previous_shard = state.get("shard", False)
+        else:
+            previous_paths = None
+            previous_shard = False
+
+        datasets = set(self.dict_datasets[study])
+        touched = set()
+
+        # Flat layout on disk and requested: single listing against the datasets
+        if (not self.shard) and (not previous_shard):
+
+            existing = set()
+            others = set()
+            with os.scandir(datasets_dir) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        existing.add(entry.name)
+                    else:
+                        others.add(entry.name)
+
+            # Create subfolders of added datasets (replacing files of the same name)
+            for index in datasets - existing:
+                if index in others:
+                    self.trash.remove(datasets_dir / index)
+                (datasets_dir / index).mkdir()
+
+            # Delete subfolders of removed datasets
+            for index in existing - datasets:
+                self.trash.remove(datasets_dir / index)
+
+        # Sharded layout (on disk or requested)
+        else:
+
+            found = {}
+            for index, path in scan_dataset_dirs(datasets_dir, datasets, self.shard)[0]:
+                found.setdefault(index, []).append(path)
+            existing = set(found)
+
+            for index, paths in found.items():
+
+                # Delete subfolders of removed datasets
+                if index not in datasets:
+                    for path in paths:
+                        self.trash.remove(path)
+                    continue
+
+                # Move kept subfolders if the layout changed (duplicates are deleted)
+                dataset_path = get_dataset_path(datasets_dir, index, self.shard)
+                if dataset_path not in paths:
+                    dataset_path.parent.mkdir(parents=True, exist_ok=True)
+                    if os.path.lexists(dataset_path):
+                        self.trash.remove(dataset_path)
+                    os.replace(paths[0], dataset_path)
+                    paths = paths[1:]
+                    touched.add(index)
+                for path in paths:
+                    if path != dataset_path:
+                        self.trash.remove(path)
+
+            # Create subfolders of added datasets (replacing files of the same name)
+            for index in datasets - existing:
+                dataset_path = get_dataset_path(datasets_dir, index, self.shard)
+                if os.path.lexists(dataset_path):
+                    self.trash.remove(dataset_path)
+                dataset_path.mkdir(parents=True)
+
+            remove_empty_shards(datasets_dir)
+
+        # Delete outdated variable paths of kept datasets: all of them if variable paths changed, otherwise the moved
+        # ones only (other stray entries of the datasets folders are left in place, not being inputs of the processes)
+        variable_paths = self.variable_paths[study]
+        if previous_paths != variable_paths:
+            touched = existing & datasets
+        for index in touched:
+            with os.scandir(get_dataset_path(datasets_dir, index, self.shard)) as it:
+                input_paths = [Path(entry.path) for entry in it]
+            for path in input_paths:
+                resolved_path = path.resolve().name
+                if resolved_path not in variable_paths:
+                    self.trash.remove(path)
+
+        if (previous_paths != variable_paths) or (previous_shard != self.shard):
+            dump_json(state_file, {"variable_paths": variable_paths, "shard": self.shard})
 
     def clean_output_tree(self,
         study: str,
@@ -1119,12 +1272,105 @@ class WorkFlow:
         outputs_folders = [f for f in study_dir.iterdir() if f.is_dir()]
         for folder in outputs_folders:
             if os.path.split(folder)[-1] != "0_inputs":
-                shutil.rmtree(folder)
+                self.trash.remove(folder)
 
-        # Paths file
+        # Paths files
         paths_file = study_dir / ".paths.json"
         if paths_file.exists():
             paths_file.unlink()
+        self.get_path_store(study).remove()
+
+        # Fingerprints file
+        fingerprints_file = study_dir / ".fingerprints.json"
+        if fingerprints_file.exists():
+            fingerprints_file.unlink()
+
+    def get_downstream_processes(self,
+        processes: list,
+    ) -> list:
+
+        # Add processes consuming the outputs of the given processes (recursively)
+        downstream = list(processes)
+        outputs = []
+        for proc in self.list_workflow:
+
+            name = proc["process"].__name__
+            consumed = list(proc.get("required_paths", {}).values()) + list(proc.get("overall_analysis", {}).values())
+            if (name not in downstream) and any(path in outputs for path in consumed):
+                downstream.append(name)
+
+            if name in downstream:
+                outputs += list(proc.get("output_paths", {}).values())
+
+        return [name for name in self.list_processes if name in downstream]
+
+    def invalidate_processes(self,
+        study: str,
+    ) -> list:
+
+        study_dir: Path = self.working_dir / study
+
+        # Without workflow diagram, the whole output tree is deleted
+        diagram_file = study_dir / ".diagram.json"
+        if not diagram_file.exists():
+
+            self.clean_output_tree(study)
+
+            # Delete analysis file
+            path = study_dir / "analysis.json"
+            if path.exists():
+                path.unlink()
+
+            return list(self.list_processes)
+
+        with open(diagram_file) as f:
+            diagram = json.load(f)
+
+        # Processes depending on a modified parameter / path (and their dependents)
+        changes = self.studies_changes[study]
+        invalidated = []
+        for name, value in diagram.items():
+            if (name in self.list_processes) and any(x in changes for x in value["allparams"] + value["allpaths"]):
+                invalidated.append(name)
+        invalidated = self.get_downstream_processes(invalidated)
+
+        # Delete outputs data
+        outputs = []
+        for step, proc in enumerate(self.list_workflow):
+            name = proc["process"].__name__
+            if name in invalidated:
+                folder_path = study_dir / f"{step + 1}_{name}"
+                if folder_path.exists():
+                    self.trash.remove(folder_path)
+                outputs += list(proc.get("output_paths", {}).values())
+
+        # Update paths store
+        store = self.get_path_store(study)
+        if store.exists():
+            store.update({output: None for output in outputs})
+
+        # Update paths, fingerprints and analysis files
+        for file, keys, reset in [
+            (study_dir / ".paths.json", outputs, True),
+            (study_dir / ".fingerprints.json", invalidated, False),
+            (study_dir / "analysis.json", invalidated, False),
+        ]:
+            if not file.exists():
+                continue
+            with open(file) as f:
+                data = json.load(f)
+
+            # Outputs of the paths json file in compact form
+            entries = data["outputs"] if is_compact_paths(data) else data
+            for key in keys:
+                if key in entries:
+                    if reset:
+                        entries[key] = None
+                    else:
+                        del entries[key]
+            dump_json(file, data)
+
+        return invalidated
 
     def set_inputs(self) -> None:
         
@@ -1134,9 +1380,6 @@ class WorkFlow:
             # Define study directory
             study_dir: Path = self.working_dir / study
 
-            # Go to study directory
-            os.chdir(study_dir)
-
             # Initialize dictionary of input paths
             self.dict_user_paths[study] = {}
 
@@ -1153,20 +1396,24 @@ class WorkFlow:
 
                 # Read input dataframe
                 self.dict_variable_params[study] = pd.read_csv(
-                    filepath_or_buffer="inputs.csv",
+                    filepath_or_buffer=study_dir / "inputs.csv",
                     index_col=0,
                 )
 
             else:
                 self.dict_variable_params[study] = pd.DataFrame()
 
+            # Columns cast to the types of the parameters, then variable parameters of each dataset (shared by all processes)
+            self.cast_variable_params(study)
+            self.dict_records[study] = self.get_records(study)
+
             # Fixed paths
             dict_input_paths = {}
             for file in self.fixed_paths[study]:
                 if self.dict_inputs[study][file] is not None:
-                    dict_input_paths[file] = self.dict_inputs[study][file]
+                    dict_input_paths[file] = str(study_dir / self.dict_inputs[study][file])
                 else:
-                    dict_input_paths[file] = str(Path(os.getcwd()) / "0_inputs" / file)
+                    dict_input_paths[file] = str(study_dir / "0_inputs" / file)
 
             self.dict_user_paths[study] = {**self.dict_user_paths[study], **dict_input_paths}
 
@@ -1174,34 +1421,61 @@ class WorkFlow:
             if len(self.variable_paths[study]) > 0:
 
                 dict_input_paths = {}
-                df_inputs = pd.read_csv(
-                    filepath_or_buffer="inputs.csv",
-                    index_col=0,
-                )
+                df_inputs = self.dict_variable_params[study]
                 for file in self.variable_paths[study]:
                     dict_input_paths[file] = {}
                     for idx in df_inputs.index:
                         if self.dict_inputs[study][file][idx] is not None:
-                            dict_input_paths[file][idx] = self.dict_inputs[study][file][idx]
+                            dict_input_paths[file][idx] = str(study_dir / self.dict_inputs[study][file][idx])
                         else:
-                            dict_input_paths[file][idx] = str(Path(os.getcwd()) / "0_inputs" / "0_datasets" / idx / file)
+                            dict_input_paths[file][idx] = str(get_dataset_path(study_dir / "0_inputs" / "0_datasets", idx, self.shard) / file)
 
                 self.dict_user_paths[study] = {**self.dict_user_paths[study], **dict_input_paths}
 
-            # Go back to working directory
-            os.chdir(self.working_dir)
+    def cast_variable_params(self,
+        study: str,
+    ) -> None:
+
+        df_inputs = self.dict_variable_params[study]
+        for param in self.variable_params[study]:
+            if (param not in df_inputs.columns) or (param not in self.params_type):
+                continue
+
+            # Lossless casts only (other values are reported by the types checks)
+            column = df_inputs[param]
+            expected_type = self.params_type[param][0]
+            if (expected_type is int) and (column.dtype.kind == "f"):
+                values = column.dropna()
+                if (values == values.round()).all():
+                    df_inputs[param] = column.astype("Int64")
+            elif (expected_type is float) and (column.dtype.kind in "iu"):
+                df_inputs[param] = column.astype(float)
+
+    def get_records(self,
+        study: str,
+    ) -> dict:
+
+        df_inputs = self.dict_variable_params[study]
+        params = [param for param in self.variable_params[study] if param in df_inputs.columns]
+
+        # Column-wise conversion to Python values
+        records = {idx: {} for idx in df_inputs.index}
+        for param in params:
+            values = df_inputs[param].tolist()
+            if df_inputs[param].dtype == object:
+                values = [convert_value(value) for value in values]
+            elif isinstance(df_inputs[param].dtype, pd.Int64Dtype):
+                values = [None if value is pd.NA else value for value in values]
+            for record, value in zip(records.values(), values):
+                record[param] = value
+
+        return records
 
     def test_inputs_settings(self) -> None:
         
         # Loop over studies
         for study in self.studies:
 
-            # Define study directory
-            study_dir: Path = self.working_dir / study
-
-            # Go to study directory
-            os.chdir(study_dir)
-
             self.fixed_params_messages[study] = []
             self.fixed_paths_messages[study] = []
             self.fixed_params_config[study] = True
@@ -1221,10 +1495,17 @@ class WorkFlow:
                 else:
                     self.fixed_params_messages[study].append(f"(V) {param}")
 
+            # Existence of all input paths (checked in batch)
+            paths = []
+            for file in self.fixed_paths[study]:
+                paths.append(self.dict_user_paths[study][file])
+            for file in self.variable_paths[study]:
+                paths += list(self.dict_user_paths[study][file].values())
+            existing = existing_paths(paths)
+
             # Fixed paths
             for file in self.fixed_paths[study]:
-                file_path: Path = Path(self.dict_user_paths[study][file])
-                if not file_path.exists():
+                if self.dict_user_paths[study][file] not in existing:
                     self.fixed_paths_messages[study].append(f"(X) {file}")
                     self.fixed_paths_config[study] = False
                 else:
@@ -1234,38 +1515,192 @@ class WorkFlow:
             if (len(self.variable_params[study]) > 0) or \
                (len(self.variable_paths[study]) > 0):
 
-                for index in self.dict_variable_params[study].index:
+                df_inputs = self.dict_variable_params[study]
+
+                # Column-wise checks (missing values and types of variable parameters)
+                missing_params = {}
+                invalid_params = {}
+                for param in self.variable_params[study]:
+                    column = df_inputs[param]
+                    missing = column.isna().to_numpy()
+                    if column.dtype == object:
+                        missing |= (column == "").to_numpy()
+                    missing_params[param] = missing
+                    invalid_params[param] = ~self.get_valid_types_mask(column, self.params_type[param][0], missing_params[param])
+
+                # Existence of variable paths
+                missing_paths = {}
+                for file in self.variable_paths[study]:
+                    paths = [self.dict_user_paths[study][file][index] for index in df_inputs.index]
+                    missing_paths[file] = np.array([path not in existing for path in paths], dtype=bool)
+
+                # Messages of the datasets with errors only (others are valid)
+                masks = list(missing_params.values()) + list(invalid_params.values()) + list(missing_paths.values())
+                if len(masks) > 0:
+                    errors = np.flatnonzero(np.logical_or.reduce(masks))
+                else:
+                    errors = []
 
+                for i in errors:
+
+                    index = df_inputs.index[i]
                     self.variable_params_messages[study][index] = []
                     self.variable_paths_messages[study][index] = []
-                    self.variable_params_config[study][index] = True
-                    self.variable_paths_config[study][index] = True
 
                     # Variable parameters
                     for param in self.variable_params[study]:
-                        value = self.dict_variable_params[study].at[index, param]
-                        if pd.isna(value) or value == "":
+                        if missing_params[param][i]:
                             self.variable_params_messages[study][index].append(f"(X) {param}")
                             self.variable_params_config[study][index] = False
+                        elif invalid_params[param][i]:
+                            self.variable_params_messages[study][index].append(f"(!) {param} ({self.params_type[param][1]} expected)")
                         else:
-                            if isinstance(value, (np.integer, np.floating, np.bool_)):
-                                value = value.item()
-                            if not isinstance(value, self.params_type[param][0]):
-                                self.variable_params_messages[study][index].append(f"(!) {param} ({self.params_type[param][1]} expected)")
-                            else:
-                                self.variable_params_messages[study][index].append(f"(V) {param}")
+                            self.variable_params_messages[study][index].append(f"(V) {param}")
 
                     # Variable paths
                     for file in self.variable_paths[study]:
-                        file_path: Path = Path(self.dict_user_paths[study][file][index])
-                        if not file_path.exists():
+                        if missing_paths[file][i]:
                             self.variable_paths_messages[study][index].append(f"(X) {file}")
                             self.variable_paths_config[study][index] = False
                         else:
                             self.variable_paths_messages[study][index].append(f"(V) {file}")
 
-            # Go back to working directory
-            os.chdir(self.working_dir)
+    def get_valid_types_mask(self,
+        column: pd.Series,
+        expected_type: type,
+        skipped: np.ndarray = None,
+    ) -> np.ndarray:
+
+        # Cells without value are not checked (valid, as they are reported as missing)
+        if skipped is None:
+            skipped = np.zeros(len(column), dtype=bool)
+
+        # Python type of the values of numeric columns
+        if column.dtype.kind in "iu":
+            return np.full(len(column), issubclass(int, expected_type)) | skipped
+        if column.dtype.kind == "f":
+            return np.full(len(column), issubclass(float, expected_type)) | skipped
+        if column.dtype.kind == "b":
+            return np.full(len(column), issubclass(bool, expected_type)) | skipped
+
+        # Otherwise check each distinct type of the values once
+        types = column[~skipped].map(type)
+        valid_types = []
+        for value_type in types.unique():
+            python_type = value_type
+            if issubclass(value_type, (np.integer, np.floating, np.bool_)):
+                python_type = type(value_type(0).item())
+            if issubclass(python_type, expected_type):
+                valid_types.append(value_type)
+
+        valid = skipped.copy()
+        valid[~skipped] = types.isin(valid_types).to_numpy()
+
+        return valid
+
+    def get_variable_messages(self,
+        study: str,
+        index: str,
+    ) -> tuple:
+
+        # Datasets without errors have no stored messages
+        if index in self.variable_params_messages[study]:
+            return self.variable_params_messages[study][index], self.variable_paths_messages[study][index]
+
+        return [f"(V) {param}" for param in self.variable_params[study]], [f"(V) {file}" for file in self.variable_paths[study]]
+
+    def get_settings_key(self,
+        signatures: dict,
+    ) -> str:
+
+        sha = hashlib.sha256(str(self.working_dir).encode())
+
+        # Versions of the pickled state and layout of the datasets folders
+        sha.update(f"{NUREMICS_VERSION}:{pd.__version__}:{self.shard}".encode())
+
+        # Workflow definition
+        for proc in self.list_workflow:
+            sha.update(json.dumps({k: v for k, v in proc.items() if k != "process"}, sort_keys=True, default=str).encode())
+            sha.update(proc["process"].__qualname__.encode())
+        sha.update(json.dumps({k: v[1] for k, v in self.params_type.items()}, sort_keys=True).encode())
+
+        # Inputs of each study
+        for study in self.studies:
+
+            sha.update(study.encode())
+            sha.update(json.dumps([
+                self.fixed_params[study],
+                self.variable_params[study],
+                self.fixed_paths[study],
+                self.variable_paths[study],
+                self.dict_inputs[study],
+            ], sort_keys=True, default=str).encode())
+
+            # Inputs csv file (hashed again only if modified)
+            inputs_file: Path = self.working_dir / study / "inputs.csv"
+            if inputs_file.exists():
+                stat = inputs_file.stat()
+                signature = signatures.get(study)
+                if (signature is None) or (signature[:2] != [stat.st_mtime_ns, stat.st_size]):
+                    signature = [stat.st_mtime_ns, stat.st_size, hash_path(inputs_file)]
+                signatures[study] = signature
+                sha.update(signature[2].encode())
+
+        return sha.hexdigest()
+
+    def load_settings_snapshot(self) -> bool:
+        """
+        Restores the validated inputs of the last launch if nothing changed
+        since (written by the same version of the package). Only the settings
+        phase is skipped: configure() still reads the studies and inputs files.
+        """
+
+        snapshot_file: Path = self.working_dir / ".settings.pkl"
+        if not snapshot_file.exists():
+            return False
+
+        try:
+            with open(snapshot_file, "rb") as f:
+                snapshot = pickle.load(f)
+        except Exception:
+            return False
+
+        if (not isinstance(snapshot, dict)) or (snapshot.get("version") != NUREMICS_VERSION):
+            return False
+        if snapshot.get("key") != self.get_settings_key(snapshot.get("signatures", {})):
+            return False
+
+        # Input paths must still exist
+        paths = []
+        for study in self.studies:
+            for value in snapshot["state"]["dict_user_paths"][study].values():
+                if isinstance(value, dict):
+                    paths += list(value.values())
+                else:
+                    paths.append(value)
+        if len(existing_paths(paths)) < len(set(paths)):
+            return False
+
+        # Restore validated inputs
+        for name, value in snapshot["state"].items():
+            setattr(self, name, value)
+
+        return True
+
+    def save_settings_snapshot(self) -> None:
+
+        signatures = {}
+        snapshot = {
+            "version": NUREMICS_VERSION,
+            "key": self.get_settings_key(signatures),
+            "signatures": signatures,
+            "state": {name: getattr(self, name) for name in SETTINGS_STATE},
+        }
+
+        tmp_file: Path = self.working_dir / f".settings.pkl.{os.getpid()}.tmp"
+        with open(tmp_file, "wb") as f:
+            pickle.dump(snapshot, f)
+        os.replace(tmp_file, self.working_dir / ".settings.pkl")
 
     def print_inputs_settings(self) -> None:
         
@@ -1278,9 +1713,6 @@ class WorkFlow:
             # Define study directory
             study_dir: Path = self.working_dir / study
 
-            # Go to study directory
-            os.chdir(study_dir)
-
             # Printing
             print()
             print(colored(f"| {study} |", "magenta"))
@@ -1300,7 +1732,7 @@ class WorkFlow:
                 elif "(X)" in message:
                     list_text.append(colored(message, "red"))
                     if config:
-                        list_errors.append(colored(f"> {Path.cwd() / 'inputs.json'}", "red"))
+                        list_errors.append(colored(f"> {study_dir / 'inputs.json'}", "red"))
                     config = False
                 elif "(!)" in message:
                     list_text.append(colored(message, "yellow"))
@@ -1332,7 +1764,7 @@ class WorkFlow:
             if type_error:
                 print()
                 print(colored("(X) Please set parameter(s) with expected type(s) in file :", "red"))
-                print(colored(f"> {Path.cwd() / 'inputs.json'}", "red"))
+                print(colored(f"> {study_dir / 'inputs.json'}", "red"))
                 sys.exit(1)
 
             # --------------- #
@@ -1349,28 +1781,29 @@ class WorkFlow:
                 if len(self.dict_variable_params[study].index) == 0:
                     print()
                     print(colored("(X) Please declare at least one experiment in file :", "red"))
-                    print(colored(f"> {Path.cwd() / 'inputs.csv'}", "red"))
+                    print(colored(f"> {study_dir / 'inputs.csv'}", "red"))
                     sys.exit(1)
 
                 for index in self.dict_variable_params[study].index:
 
                     list_text = [colored(f"> {index} :", "blue")]
+                    params_messages, paths_messages = self.get_variable_messages(study, index)
 
                     # Variable parameters
-                    for message in self.variable_params_messages[study][index]:
+                    for message in params_messages:
                         if "(V)" in message:
                             list_text.append(colored(message, "green"))
                         elif "(X)" in message:
                             list_text.append(colored(message, "red"))
                             if config:
-                                list_errors.append(colored(f"> {Path.cwd() / 'inputs.csv'}", "red"))
+                                list_errors.append(colored(f"> {study_dir / 'inputs.csv'}", "red"))
                             config = False
                         elif "(!)" in message:
                             list_text.append(colored(message, "yellow"))
                             type_error = True
 
                     # Variable paths
-                    for i, message in enumerate(self.variable_paths_messages[study][index]):
+                    for i, message in enumerate(paths_messages):
                         if "(V)" in message:
                             list_text.append(colored(message, "green"))
                         elif "(X)" in message:
@@ -1393,12 +1826,9 @@ class WorkFlow:
                 if type_error:
                     print()
                     print(colored("(X) Please set parameter(s) with expected type(s) in file :", "red"))
-                    print(colored(f"> {Path.cwd() / 'inputs.csv'}", "red"))
+                    print(colored(f"> {study_dir / 'inputs.csv'}", "red"))
                     sys.exit(1)
 
-            # Go back to working directory
-            os.chdir(self.working_dir)
-
     def init_paths(self) -> None:
         
         # Loop over studies
@@ -1407,78 +1837,331 @@ class WorkFlow:
             # Define study directory
             study_dir: Path = self.working_dir / study
 
+            # Paths store (initialized from the paths json file of previous versions)
+            store = self.get_path_store(study)
             file_output_paths = study_dir / ".paths.json"
-            if file_output_paths.exists():
+            self.dataset_indexes[study] = DatasetIndex(self.dict_datasets[study])
+            if store.exists():
+                if store.set_datasets(self.dict_datasets[study]):
+                    self.paths_modified.add(study)
+                dict_paths = store.load(index=self.dataset_indexes[study])
+                modified = False
+            elif file_output_paths.exists():
                 with open(file_output_paths) as f:
-                    dict_paths = json.load(f)
+                    dict_paths = decode_paths(json.load(f), self.dataset_indexes[study])
+                modified = True
             else:
                 dict_paths = {}
                 for path in self.output_paths:
                     dict_paths[path] = None
+                modified = True
 
-            # Purge old datasets
+            # Purge old datasets (already dropped by the store for the paths following the templates)
+            datasets = set(self.dict_datasets[study])
+            removed = {}
             for key, value in dict_paths.items():
-                if isinstance(value, dict):
+                if isinstance(value, Mapping):
                     # List of datasets to delete
-                    to_delete = [dataset for dataset in value if dataset not in self.dict_datasets[study]]
+                    to_delete = [dataset for dataset in value if dataset not in datasets]
                     for dataset in to_delete:
                         del dict_paths[key][dataset]
+                    if len(to_delete) > 0:
+                        removed[key] = to_delete
 
             self.dict_paths[study] = dict_paths
+            if modified:
+                self.write_paths(study)
+            elif len(removed) > 0:
+                self.write_paths(study, removed=removed)
+
+            # Fingerprints of the last execution of each process / dataset
+            file_fingerprints = study_dir / ".fingerprints.json"
+            if file_fingerprints.exists():
+                with open(file_fingerprints) as f:
+                    dict_fingerprints = json.load(f)
+            else:
+                dict_fingerprints = {}
 
-    def update_analysis(self) -> None:
+            # Purge old datasets
+            for key, value in dict_fingerprints.items():
+                if isinstance(value, dict):
+                    dict_fingerprints[key] = {k: v for k, v in value.items() if k in datasets}
+
+            self.dict_fingerprints[study] = dict_fingerprints
+
+    def get_path_store(self,
+        study: str,
+    ) -> PathStore:
+
+        if study not in self.path_stores:
+            self.path_stores[study] = PathStore(self.working_dir / study / ".paths.db")
+
+        return self.path_stores[study]
+
+    def write_paths(self,
+        study: str,
+        updates: dict = None,
+        removed: dict = None,
+    ) -> None:
+
+        store = self.get_path_store(study)
+        store.set_datasets(self.dict_datasets[study])
+
+        # Whole store for a new one, otherwise the modified outputs / datasets only
+        # (outputs of executed units are stored one by one)
+        if (updates is None) and (removed is None):
+            store.save(self.dict_paths[study])
+        else:
+            store.update(updates or {})
+            store.delete_datasets(removed or {})
+
+        # Paths json file exported once the settings / the study are completed
+        self.paths_modified.add(study)
+
+    def export_paths(self,
+        study: str,
+    ) -> None:
+
+        # Copy of the paths store in compact form (templates and bitmaps)
+        dump_json(self.working_dir / study / ".paths.json", encode_paths(self.dict_paths[study]))
+
+    def get_inputs_snapshot(self,
+        study: str,
+    ) -> dict:
+
+        def _to_json(value: object) -> object:
+            if pd.isna(value):
+                return None
+            return convert_value(value)
+
+        # Fixed inputs
+        snapshot = {"fixed": {}, "variable": {}}
+        for key in self.fixed_params[study] + self.fixed_paths[study]:
+            snapshot["fixed"][key] = self.dict_inputs[study].get(key)
+
+        # Variable inputs of each dataset
+        records = self.dict_records[study]
+        for idx in self.dict_datasets[study]:
+            snapshot["variable"][idx] = {}
+            for param in self.variable_params[study]:
+                snapshot["variable"][idx][param] = _to_json(records[idx].get(param))
+            for path in self.variable_paths[study]:
+                snapshot["variable"][idx][path] = self.dict_inputs[study][path].get(idx)
+
+        return json.loads(json.dumps(snapshot, default=str))
+
+    def invalidate_datasets(self) -> None:
 
         # Loop over studies
         for study in self.studies:
 
-            # Define study directory
             study_dir: Path = self.working_dir / study
+            snapshot_file = study_dir / ".inputs.json"
+            diagram_file = study_dir / ".diagram.json"
+            snapshot = self.get_inputs_snapshot(study)
+
+            if snapshot_file.exists() and diagram_file.exists():
+
+                with open(snapshot_file) as f:
+                    old_snapshot = json.load(f)
+                with open(diagram_file) as f:
+                    diagram = json.load(f)
+
+                # Modified inputs with related datasets (None for all datasets)
+                changes = {}
+                for key, value in snapshot["fixed"].items():
+                    if (key in old_snapshot["fixed"]) and (old_snapshot["fixed"][key] != value):
+                        changes[key] = None
+                for idx, values in snapshot["variable"].items():
+                    old_values = old_snapshot["variable"].get(idx, {})
+                    for key, value in values.items():
+                        if (key in old_values) and (old_values[key] != value) and (key not in changes):
+                            changes.setdefault(key, []).append(idx)
+
+                # Processes / datasets to invalidate
+                targets = {}
+                for key, datasets in changes.items():
+                    direct = [name for name, value in diagram.items() if (name in self.list_processes) and (key in value["allparams"] + value["allpaths"])]
+                    for name in self.get_downstream_processes(direct):
+                        if (datasets is None) or (not self.is_case_output(study, name)):
+                            targets[name] = None
+                        elif name not in targets:
+                            targets[name] = list(datasets)
+                        elif targets[name] is not None:
+                            targets[name] = list(dict.fromkeys(targets[name] + datasets))
+
+                updates = {}
+                removed = {}
+                for name, datasets in targets.items():
+                    for output_path, indices in self.invalidate_outputs(study, name, datasets).items():
+                        if indices is None:
+                            updates[output_path] = None
+                        else:
+                            removed[output_path] = indices
 
-            # Define analysis file
-            analysis_file = study_dir / "analysis.json"
+                    # Printing
+                    if datasets is None:
+                        text = "all datasets"
+                    else:
+                        text = ", ".join(datasets)
+                    print()
+                    print(colored(f"(!) {study} | {name} : inputs have been modified, outputs are deleted ({text}).", "yellow"))
 
-            # Initialize analysis file
-            if os.path.exists(analysis_file):
-                with open(analysis_file) as f:
-                    self.dict_analysis[study] = json.load(f)
-            else:
-                self.dict_analysis[study] = {}
+                if len(targets) > 0:
+
+                    # Write modified paths
+                    self.write_paths(study, updates, removed)
+
+                    # Write fingerprints json file
+                    dump_json(study_dir / ".fingerprints.json", self.dict_fingerprints[study])
+
+            # Write inputs snapshot
+            dump_json(snapshot_file, snapshot)
+
+            # Paths json file updated if paths were modified since last launch
+            if study in self.paths_modified:
+                self.export_paths(study)
+                self.paths_modified.discard(study)
+
+    def is_case_output(self,
+        study: str,
+        name: str,
+    ) -> bool:
+
+        # Process outputs are stored by dataset
+        proc = self.list_workflow[self.list_processes.index(name)]
+        for output_path in proc.get("output_paths", {}).values():
+            if isinstance(self.dict_paths[study].get(output_path), Mapping):
+                return True
+
+        return False
+
+    def invalidate_outputs(self,
+        study: str,
+        name: str,
+        datasets: list = None,
+    ) -> dict:
+
+        step = self.list_processes.index(name)
+        proc = self.list_workflow[step]
+        folder_path: Path = self.working_dir / study / f"{step + 1}_{name}"
+        dict_paths = self.dict_paths[study]
+        dict_fingerprints = self.dict_fingerprints[study]
+
+        # Whole process
+        if datasets is None:
+            if folder_path.exists():
+                self.trash.remove(folder_path)
+            for output_path in proc.get("output_paths", {}).values():
+                dict_paths[output_path] = None
+            dict_fingerprints.pop(name, None)
+            return {output_path: None for output_path in proc.get("output_paths", {}).values()}
+
+        # Datasets of the process
+        removed = {}
+        for idx in datasets:
+            dataset_path = get_dataset_path(folder_path, idx, self.shard)
+            if dataset_path.exists():
+                self.trash.remove(dataset_path)
+            for output_path in proc.get("output_paths", {}).values():
+                if isinstance(dict_paths.get(output_path), Mapping):
+                    dict_paths[output_path].pop(idx, None)
+                    removed.setdefault(output_path, []).append(idx)
+            if isinstance(dict_fingerprints.get(name), dict):
+                dict_fingerprints[name].pop(idx, None)
+
+        # Modified outputs (None for a whole process) with their removed datasets
+        return removed
+
+    def update_analysis(self,
+        studies: list = None,
+    ) -> None:
+
+        # Loop over studies (all of them by default)
+        if studies is None:
+            studies = self.studies
+        for study in studies:
+
+            # Nothing changed since the last update
+            state = self.get_analysis_state(study)
+            if (study in self.dict_analysis) and (self.analysis_state.get(study) == state):
+                continue
+
+            # Settings are kept in memory (reloaded in place if the file was edited, processes sharing them)
+            if (study not in self.dict_analysis) or (self.analysis_state.get(study, (None,))[0] != state[0]):
+                dict_analysis = self.dict_analysis.setdefault(study, {})
+                dict_analysis.clear()
+                if state[0] is not None:
+                    with open(self.working_dir / study / "analysis.json") as f:
+                        dict_analysis.update(json.load(f))
+                else:
+                    self.analysis_dirty.add(study)
+
+            dict_analysis = self.dict_analysis[study]
+            datasets = set(self.dict_datasets[study])
 
             # Browse all datasets
             for proc, settings in self.settings_by_process.items():
 
                 # Initialize proc key
-                if proc not in self.dict_analysis[study]:
-                    self.dict_analysis[study][proc] = {}
+                if proc not in dict_analysis:
+                    dict_analysis[proc] = {}
+                    self.analysis_dirty.add(study)
 
                 # Add missing datasets
                 for dataset in self.dict_datasets[study]:
-                    if dataset not in self.dict_analysis[study][proc]:
-                        self.dict_analysis[study][proc][dataset] = settings
+                    if dataset not in dict_analysis[proc]:
+                        dict_analysis[proc][dataset] = copy.deepcopy(settings)
+                        self.analysis_dirty.add(study)
 
                 # Delete useless datasets
-                datasets_to_delete = []
-                for dataset in self.dict_analysis[study][proc]:
-                    if dataset not in self.dict_datasets[study]:
-                        datasets_to_delete.append(dataset)
-
+                datasets_to_delete = [dataset for dataset in dict_analysis[proc] if dataset not in datasets]
                 for dataset in datasets_to_delete:
-                    if dataset in self.dict_analysis[study][proc]:
-                        del self.dict_analysis[study][proc][dataset]
+                    del dict_analysis[proc][dataset]
+                    self.analysis_dirty.add(study)
 
-            with open(analysis_file, "w") as f:
-                json.dump(self.dict_analysis[study], f, indent=4)
+            self.flush_analysis(study)
 
-    def clean_outputs(self) -> None:
+    def flush_analysis(self,
+        study: str,
+    ) -> None:
 
-        # Function to remove output path, either file or directory
-        def _remove_output(output: str) -> None:
-            output_path = Path(output)
-            if output_path.exists():
-                if output_path.is_dir():
-                    shutil.rmtree(output)
-                else:
-                    output_path.unlink()
+        # Write analysis file of a study only if its settings changed
+        if study not in self.analysis_dirty:
+            self.analysis_state[study] = self.get_analysis_state(study)
+            return
+
+        analysis_file: Path = self.working_dir / study / "analysis.json"
+        dump_json(analysis_file, self.dict_analysis[study])
+        self.analysis_dirty.discard(study)
+        self.analysis_state[study] = self.get_analysis_state(study)
+
+    def get_analysis_state(self,
+        study: str,
+    ) -> tuple:
+
+        analysis_file: Path = self.working_dir / study / "analysis.json"
+        if analysis_file.exists():
+            mtime = analysis_file.stat().st_mtime_ns
+        else:
+            mtime = None
+
+        return (mtime, tuple(self.dict_datasets[study]))
+
+    def remove_output(self,
+        output: str,
+    ) -> None:
+
+        # Remove output path, either file or directory (in the background)
+        self.trash.remove(output)
+
+    def wait_deletions(self) -> None:
+
+        # Block until the trash is emptied
+        if self.trash is not None:
+            self.trash.wait()
+
+    def clean_outputs(self) -> None:
 
         # Loop over studies
         for study, study_dict in self.dict_studies["config"].items():
@@ -1487,20 +2170,31 @@ class WorkFlow:
             for key, value in study_dict["clean_outputs"].items():
                 if value:
                     if isinstance(self.dict_paths[study][key], str):
-                        _remove_output(self.dict_paths[study][key])
-                    if isinstance(self.dict_paths[study][key], dict):
+                        self.remove_output(self.dict_paths[study][key])
+                    if isinstance(self.dict_paths[study][key], Mapping):
                         for _, value in self.dict_paths[study][key].items():
-                            _remove_output(value)
+                            self.remove_output(value)
 
     def purge_output_datasets(self,
         study: str,
+        folder_path: Path,
     ) -> None:
-        
-        datasets_paths = [f for f in Path.cwd().iterdir()]
-        for path in datasets_paths:
-            resolved_path = path.resolve().name
-            if resolved_path not in self.dict_datasets[study]:
-                shutil.rmtree(path)
+
+        # Single listing of the process folder against the live datasets
+        # (folders of another layout are deleted as well)
+        datasets = set(self.dict_datasets[study])
+        found, others = scan_dataset_dirs(folder_path, datasets, self.shard)
+        to_delete = list(others)
+        for idx, path in found:
+            if (idx not in datasets) or (path != get_dataset_path(folder_path, idx, self.shard)):
+                to_delete.append(str(path))
+
+        for path in to_delete:
+            self.remove_output(path)
+
+        # Shards left empty
+        if len(to_delete) > 0:
+            remove_empty_shards(folder_path)
 
     def update_workflow_diagram(self,
         process: Process,
@@ -1515,196 +2209,636 @@ class WorkFlow:
             "output_paths": list(process.output_paths.values()),
         }
 
-    def __call__(self) -> None:
-        
-        # --------------- #
-        # Launch workflow #
-        # --------------- #
-        print()
-        print(
-            colored("> RUNNING <", "blue", attrs=["reverse"]),
-        )
+    def get_upstream_steps(self,
+        step: int,
+    ) -> list:
+
+        # Outputs consumed by the process (required paths and overall analysis)
+        proc = self.list_workflow[step]
+        consumed = list(self.diagram[self.list_processes[step]]["required_paths"])
+        if "overall_analysis" in proc:
+            consumed += list(proc["overall_analysis"].values())
+
+        # Previous processes producing these outputs
+        upstream = []
+        for i in range(step):
+            if any(path in consumed for path in self.diagram[self.list_processes[i]]["output_paths"]):
+                upstream.append(i)
+
+        return upstream
 
-        for study, dict_study in self.dict_studies["config"].items():
+    def prepare_study(self,
+        study: str,
+        scheduler: Scheduler,
+    ) -> None:
+
+        study_dir: Path = self.working_dir / study
+
+        # Position of the study and of each dataset (priority in pipelined mode)
+        rank = list(self.dict_studies["config"]).index(study)
+        positions = {idx: i for i, idx in enumerate(self.dict_datasets[study])}
 
-            # Check if study must be executed
-            if not dict_study["execute"]:
+        for step, proc in enumerate(self.list_workflow):
+
+            if "hard_params" in proc:
+                dict_hard_params = proc["hard_params"]
+            else:
+                dict_hard_params = {}
+            
+            if "user_params" in proc:
+                user_params = proc["user_params"]
+            else:
+                user_params = {}
+            
+            if "user_paths" in proc:
+                user_paths = proc["user_paths"]
+            else:
+                user_paths = {}
+            
+            if "required_paths" in proc:
+                required_paths = proc["required_paths"]
+            else:
+                required_paths = {}
+            
+            if "output_paths" in proc:
+                output_paths = proc["output_paths"]
+            else:
+                output_paths = {}
+            
+            if "overall_analysis" in proc:
+                overall_analysis = proc["overall_analysis"]
+            else:
+                overall_analysis = {}
+
+            # Define class object for the current process
+            process = proc["process"]
+            process_kwargs = dict(
+                study=study,
+                df_user_params=self.dict_variable_params[study],
+                dict_records=self.dict_records[study],
+                dict_user_params=self.dict_fixed_params[study],
+                dict_user_paths=self.dict_user_paths[study],
+                dict_paths=self.dict_paths[study],
+                params=user_params,
+                paths=user_paths,
+                dict_hard_params=dict_hard_params,
+                fixed_params=self.fixed_params[study],
+                variable_params=self.variable_params[study],
+                fixed_paths=self.fixed_paths[study],
+                variable_paths=self.variable_paths[study],
+                required_paths=required_paths,
+                output_paths=output_paths,
+                overall_analysis=overall_analysis,
+                dict_analysis=self.dict_analysis[study],
+                silent=self.dict_process[study][self.list_processes[step]]["silent"],
+                diagram=self.diagram,
+            )
+            this_process: Process = process(**process_kwargs)
+
+            # Define process name
+            this_process.name = this_process.__class__.__name__
+
+            # Define working folder associated to the current process
+            folder_name = f"{step + 1}_{this_process.name}"
+            folder_path: Path = study_dir / folder_name
+            folder_path.mkdir(exist_ok=True, parents=True)
+            this_process.working_dir = folder_path
+
+            # Initialize process
+            this_process.initialize()
+
+            # Update workflow diagram
+            self.update_workflow_diagram(this_process)
+
+            execute = self.dict_process[study][self.list_processes[step]]["execute"]
+            self.dict_tasks[(study, step)] = {
+                "process": this_process,
+                "kwargs": process_kwargs,
+                "folder_path": folder_path,
+                "execute": execute,
+                "datasets": [],
+            }
+
+            # Check if process must be executed
+            if not execute:
 
                 # Printing
                 print()
                 print(
-                    colored(f"| {study} |", "magenta"),
+                    colored(f"| {study} | {this_process.name} |", "magenta"),
                 )
                 print()
-                print(colored("(!) Study is skipped.", "yellow"))
+                print(colored("(!) Process is skipped.", "yellow"))
+
+                scheduler.add((study, step), [], barrier=True)
 
                 continue
 
-            study_dir: Path = self.working_dir / study
-            os.chdir(study_dir)
+            units = []
+            if this_process.is_case:
 
-            for step, proc in enumerate(self.list_workflow):
+                # Datasets not to be executed
+                df_inputs = self.dict_variable_params[study]
+                skipped = set(df_inputs.index[df_inputs["EXECUTE"] == 0])
 
-                self.update_analysis()
+                # Define units associated to each ID of the inputs dataframe
+                for idx in this_process.df_params.index:
 
-                if "hard_params" in proc:
-                    dict_hard_params = proc["hard_params"]
-                else:
-                    dict_hard_params = {}
-                
-                if "user_params" in proc:
-                    user_params = proc["user_params"]
-                else:
-                    user_params = {}
-                
-                if "user_paths" in proc:
-                    user_paths = proc["user_paths"]
-                else:
-                    user_paths = {}
-                
-                if "required_paths" in proc:
-                    required_paths = proc["required_paths"]
-                else:
-                    required_paths = {}
-                
-                if "output_paths" in proc:
-                    output_paths = proc["output_paths"]
-                else:
-                    output_paths = {}
-                
-                if "overall_analysis" in proc:
-                    overall_analysis = proc["overall_analysis"]
-                else:
-                    overall_analysis = {}
-
-                # Define class object for the current process
-                process = proc["process"]
-                this_process: Process = process(
-                    study=study,
-                    df_user_params=self.dict_variable_params[study],
-                    dict_user_params=self.dict_fixed_params[study],
-                    dict_user_paths=self.dict_user_paths[study],
-                    dict_paths=self.dict_paths[study],
-                    params=user_params,
-                    paths=user_paths,
-                    dict_hard_params=dict_hard_params,
-                    fixed_params=self.fixed_params[study],
-                    variable_params=self.variable_params[study],
-                    fixed_paths=self.fixed_paths[study],
-                    variable_paths=self.variable_paths[study],
-                    required_paths=required_paths,
-                    output_paths=output_paths,
-                    overall_analysis=overall_analysis,
-                    dict_analysis=self.dict_analysis[study],
-                    silent=self.dict_process[study][self.list_processes[step]]["silent"],
-                    diagram=self.diagram,
-                )
+                    # Check if dataset must be executed
+                    if idx in skipped:
 
-                # Define process name
-                this_process.name = this_process.__class__.__name__
+                        # Printing
+                        print()
+                        print(
+                            colored(f"| {study} | {this_process.name} | {idx} |", "magenta"),
+                        )
+                        print()
+                        print(colored("(!) Experiment is skipped.", "yellow"))
 
-                # Define working folder associated to the current process
-                folder_name = f"{step + 1}_{this_process.name}"
-                folder_path: Path = study_dir / folder_name
-                folder_path.mkdir(exist_ok=True, parents=True)
-                os.chdir(folder_path)
+                        continue
 
-                # Initialize process
-                this_process.initialize()
+                    units.append((study, step, idx))
 
-                # Check if process must be executed
-                if not self.dict_process[study][self.list_processes[step]]["execute"]:
+                # Batch process: one unit by chunk of datasets
+                if this_process.batch:
+                    units = self.get_batch_units(study, step, [unit[2] for unit in units], this_process.batch_size)
+
+            else:
+                units.append((study, step, None))
+
+            upstream_steps = self.get_upstream_steps(step)
+            for unit in units:
+
+                # Unit completed by an interrupted run
+                if all((study, step, idx) in self.resumed for idx in self.get_unit_datasets(unit)):
 
                     # Printing
                     print()
-                    print(
-                        colored(f"| {study} | {this_process.name} |", "magenta"),
-                    )
+                    if isinstance(unit[2], tuple):
+                        print(
+                            colored(f"| {study} | {this_process.name} | {len(unit[2])} dataset(s) |", "magenta"),
+                        )
+                    elif unit[2] is None:
+                        print(
+                            colored(f"| {study} | {this_process.name} |", "magenta"),
+                        )
+                    else:
+                        print(
+                            colored(f"| {study} | {this_process.name} | {unit[2]} |", "magenta"),
+                        )
                     print()
-                    print(colored("(!) Process is skipped.", "yellow"))
+                    print(colored("(!) Outputs are resumed from journal.", "yellow"))
 
-                    # Update workflow diagram
-                    self.update_workflow_diagram(this_process)
+                    scheduler.add(unit, [], barrier=True)
 
                     continue
 
-                if this_process.is_case:
+                # Unit waits for the processes producing its inputs
+                datasets = self.get_unit_datasets(unit)
+                self.dict_tasks[(study, step)]["datasets"] += datasets
+                dependencies = list(dict.fromkeys(self.get_upstream_unit(scheduler, study, i, idx) for i in upstream_steps for idx in datasets))
 
-                    # Define sub-folders associated to each ID of the inputs dataframe
-                    for idx in this_process.df_params.index:
+                # Datasets are streamed through the whole workflow in pipelined mode
+                if self.pipeline:
+                    priority = (rank, positions.get(datasets[0], -1), step)
+                else:
+                    priority = 0
 
-                        # Printing
-                        print()
-                        print(
-                            colored(f"| {study} | {this_process.name} | {idx} |", "magenta"),
-                        )
+                scheduler.add(unit, dependencies, priority=priority)
 
-                        # Check if dataset must be executed
-                        if self.dict_variable_params[study].loc[idx, "EXECUTE"] == 0:
+            # Process is completed once all its units are
+            scheduler.add((study, step), units, barrier=True)
 
-                            # Printing
-                            print()
-                            print(colored("(!) Experiment is skipped.", "yellow"))
+        # Outputs to clean are deleted once all their consumers are completed
+        for step, proc in enumerate(self.list_workflow):
+            for output_path in proc.get("output_paths", {}).values():
+
+                if not self.dict_studies["config"][study]["clean_outputs"][output_path]:
+                    continue
 
-                            # Go back to working folder
-                            os.chdir(folder_path)
+                consumers = []
+                for i in range(step + 1, len(self.list_workflow)):
+                    if step in self.get_upstream_steps(i):
+                        consumers.append(i)
 
-                            # Purge old output datasets
-                            self.purge_output_datasets(study)
+                if self.dict_tasks[(study, step)]["process"].is_case:
+                    datasets = self.dict_datasets[study]
+                else:
+                    datasets = [None]
+
+                for idx in datasets:
+                    unit = ("clean_outputs", study, output_path, idx)
+                    dependencies = [self.get_upstream_unit(scheduler, study, i, idx) for i in [step] + consumers]
+                    scheduler.add(unit, dependencies, barrier=True)
+
+        # Study is completed once all its processes are
+        scheduler.add((study,), [(study, step) for step in range(len(self.list_workflow))], barrier=True)
+
+    def get_upstream_unit(self,
+        scheduler: Scheduler,
+        study: str,
+        step: int,
+        idx: str,
+    ) -> tuple:
+
+        # Wait for the same dataset (or its chunk) of the upstream process in pipelined mode
+        unit = self.batch_units.get((study, step, idx), (study, step, idx))
+        if self.pipeline and (idx is not None) and (unit in scheduler):
+            return unit
+
+        # Otherwise wait for the whole upstream process
+        return (study, step)
+
+    def get_batch_units(self,
+        study: str,
+        step: int,
+        datasets: list,
+        batch_size: int = None,
+    ) -> list:
+
+        # Chunks of datasets (all of them by default)
+        if batch_size is None:
+            batch_size = max(1, len(datasets))
+
+        units = []
+        for i in range(0, len(datasets), batch_size):
+            unit = (study, step, tuple(datasets[i:i + batch_size]))
+            for idx in unit[2]:
+                self.batch_units[(study, step, idx)] = unit
+            units.append(unit)
 
-                            # Update workflow diagram
-                            self.update_workflow_diagram(this_process)
+        return units
 
-                            continue
+    def get_unit_datasets(self,
+        unit: tuple,
+    ) -> list:
 
-                        # Update process index
-                        this_process.index = idx
+        # Datasets of a work unit (a chunk of them for a batch process)
+        if isinstance(unit[2], tuple):
+            return list(unit[2])
 
-                        subfolder_path = study_dir / folder_name / str(idx)
-                        subfolder_path.mkdir(exist_ok=True, parents=True)
-                        os.chdir(subfolder_path)
+        return [unit[2]]
 
-                        # Launch process
-                        this_process()
-                        this_process.finalize()
+    def get_fingerprints(self,
+        study: str,
+        step: int,
+    ) -> dict:
+
+        # Fingerprints of the last execution, by dataset (None for a process which is not a case)
+        fingerprints = self.dict_fingerprints[study].get(self.list_processes[step])
+        if isinstance(fingerprints, dict):
+            return fingerprints
+        if fingerprints is not None:
+            return {None: fingerprints}
+
+        return {}
+
+    def merge_outputs(self,
+        study: str,
+        step: int,
+        results: dict,
+    ) -> None:
 
-                        # Go back to working folder
-                        os.chdir(folder_path)
+        dict_paths = self.dict_paths[study]
+        dict_fingerprints = self.dict_fingerprints[study]
+        name = self.list_processes[step]
 
-                        # Purge old output datasets
-                        self.purge_output_datasets(study)
+        updates = {}
+        for idx, result in results.items():
 
+            for output_path, path in result["paths"].items():
+                if idx is None:
+                    dict_paths[output_path] = path
+                    updates[output_path] = path
                 else:
+                    if not isinstance(dict_paths.get(output_path), Mapping):
+                        dict_paths[output_path] = OutputPaths(index=self.dataset_indexes[study])
+                    dict_paths[output_path][idx] = path
+                    updates.setdefault(output_path, {})[idx] = path
+
+            if result["fingerprint"] is not None:
+                if idx is None:
+                    dict_fingerprints[name] = result["fingerprint"]
+                else:
+                    if not isinstance(dict_fingerprints.get(name), dict):
+                        dict_fingerprints[name] = {}
+                    dict_fingerprints[name][idx] = result["fingerprint"]
+
+        # Only the paths of the completed units are written (paths file exported if any changed)
+        if self.get_path_store(study).update(updates):
+            self.paths_modified.add(study)
+
+    def replay_journal(self,
+        study: str,
+    ) -> None:
+
+        # Units of an interrupted run whose outputs are still available
+        for record in self.journals[study].read():
+
+            if record["process"] not in self.list_processes:
+                continue
+
+            paths = [path for path in record["paths"].values() if path is not None]
+            if not all(Path(path).exists() for path in paths):
+                continue
+
+            step = self.list_processes.index(record["process"])
+            self.merge_outputs(study, step, {record["dataset"]: record})
+            self.resumed.add((study, step, record["dataset"]))
+
+    def journal_outputs(self,
+        study: str,
+        step: int,
+        results: dict,
+    ) -> None:
+
+        # One record per completed unit, on disk before the next one completes
+        for idx, result in results.items():
+            self.journals[study].append({
+                "process": self.list_processes[step],
+                "dataset": idx,
+                "paths": result["paths"],
+                "fingerprint": result["fingerprint"],
+            })
+
+    def on_completed(self,
+        unit: tuple,
+    ) -> None:
+
+        # Output no longer needed by any process
+        if unit[0] == "clean_outputs":
+            _, study, output_path, idx = unit
+            path = self.dict_paths[study].get(output_path)
+            if isinstance(path, Mapping):
+                path = path.get(idx)
+            if isinstance(path, str):
+                self.remove_output(path)
+            return
+
+        # Unit resumed from journal
+        if len(unit) == 3:
+            return
+
+        study = unit[0]
+        study_dir: Path = self.working_dir / study
+
+        # Study completed
+        if len(unit) == 1:
+
+            # Write diagram json file
+            dump_json(study_dir / ".diagram.json", self.diagram)
+
+            # Write paths json file (if modified)
+            if study in self.paths_modified:
+                self.export_paths(study)
+                self.paths_modified.discard(study)
+
+            return
+
+        # Process completed
+        task = self.dict_tasks[unit]
+        if not task["execute"]:
+            return
+
+        # Purge old output datasets
+        if task["process"].is_case:
+            self.purge_output_datasets(study, task["folder_path"])
+
+        # Write fingerprints json file
+        if self.incremental:
+            dump_json(study_dir / ".fingerprints.json", self.dict_fingerprints[study])
+
+    def start_step(self,
+        scheduler: Scheduler,
+        key: tuple,
+    ) -> None:
+
+        if key in self.checked_steps:
+            return
+        self.checked_steps.add(key)
+
+        # Analysis settings edited since the previous step are taken into account (unchanged file not read again)
+        self.update_analysis([key[0]])
+
+        self.check_process_paths(scheduler, key)
+
+    def check_process_paths(self,
+        scheduler: Scheduler,
+        key: tuple,
+    ) -> None:
+
+        # Required paths are checked once for all datasets of the process when its first unit is launched, if the processes producing them are completed
+        # (otherwise, as in pipelined mode, they are checked by unit when it is launched)
+        process: Process = self.dict_tasks[key]["process"]
+        process.checked_paths = set()
+
+        study, step = key
+        if all((study, i) in scheduler.completed for i in self.get_upstream_steps(step)):
+            process.check_required_paths(self.dict_tasks[key]["datasets"])
+
+    def get_worker_kwargs(self,
+        key: tuple,
+        indices: list,
+    ) -> dict:
+
+        # Paths are loaded by the worker and only the records of its datasets are sent
+        kwargs = {**self.dict_tasks[key]["kwargs"], "dict_paths": None}
+        if kwargs["dict_records"] is not None:
+            kwargs["dict_records"] = {idx: kwargs["dict_records"][idx] for idx in indices if idx is not None}
+
+        # Paths already checked by the main process are not checked again by the worker
+        process: Process = self.dict_tasks[key]["process"]
+        if len(process.checked_paths) > 0:
+            checked = set()
+            for output_path in process.required_paths.values():
+                paths = process.dict_paths.get(output_path)
+                if isinstance(paths, Mapping):
+                    checked.update(paths.get(idx) for idx in indices)
+                else:
+                    checked.add(paths)
+            kwargs["checked_paths"] = checked & process.checked_paths
+
+        return kwargs
+
+    def run_scheduler(self,
+        scheduler: Scheduler,
+        pool: ProcessPoolExecutor,
+        jobs: int,
+    ) -> None:
+
+        for unit in scheduler.start():
+            self.on_completed(unit)
+
+        running = {}
+        while not scheduler.is_finished():
+
+            # Launch units one by one in the current process
+            if pool is None:
+
+                units = scheduler.pop_ready(limit=1)
+                if len(units) == 0:
+                    raise RuntimeError("Workflow scheduler is stalled: no unit can be executed.")
+
+                unit = units[0]
+                task = self.dict_tasks[unit[:2]]
+                self.start_step(scheduler, unit[:2])
+                results = run_process(
+                    task["process"],
+                    self.get_unit_datasets(unit),
+                    task["folder_path"],
+                    self.chdir,
+                    self.get_fingerprints(*unit[:2]),
+                    self.incremental,
+                    self.cache,
+                    self.shard,
+                    self.trash,
+                )
+                self.merge_outputs(unit[0], unit[1], results)
+                self.journal_outputs(unit[0], unit[1], results)
+                for completed in scheduler.complete(unit):
+                    self.on_completed(completed)
+
+                continue
+
+            # Dispatch chunks of units to the workers, keeping a bounded number of them in flight
+            # (single units in pipelined mode so that datasets go through the workflow early)
+            while len(running) < jobs * 2:
+
+                if self.pipeline:
+                    chunksize = 1
+                else:
+                    chunksize = max(1, scheduler.nb_ready() // (jobs * 4))
+
+                units = scheduler.pop_ready(limit=chunksize)
+                if len(units) == 0:
+                    break
+
+                # Group units by process
+                groups = {}
+                for unit in units:
+                    groups.setdefault(unit[:2], []).append(unit)
+
+                for key, group in groups.items():
+                    task = self.dict_tasks[key]
+                    self.start_step(scheduler, key)
+                    indices = [idx for unit in group for idx in self.get_unit_datasets(unit)]
+                    future = pool.submit(
+                        run_process_worker,
+                        task["process"].__class__,
+                        self.get_worker_kwargs(key, indices),
+                        indices,
+                        task["folder_path"],
+                        self.chdir,
+                        self.get_fingerprints(*key),
+                        self.incremental,
+                        self.cache,
+                        self.get_path_store(key[0]).path,
+                        self.shard,
+                        self.trash,
+                    )
+                    running[future] = group
+
+            if len(running) == 0:
+                raise RuntimeError("Workflow scheduler is stalled: no unit can be executed.")
+
+            # Collect completed units
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                units = running.pop(future)
+                results = future.result()
+                self.merge_outputs(units[0][0], units[0][1], results)
+                self.journal_outputs(units[0][0], units[0][1], results)
+                for unit in units:
+                    for completed in scheduler.complete(unit):
+                        self.on_completed(completed)
+
+    def __call__(self,
+        jobs: int = 1,
+        pipeline: bool = False,
+        incremental: bool = False,
+        cache: bool = False,
+        cache_size: int = None,
+        resume: bool = False,
+    ) -> None:
+        
+        # --------------- #
+        # Launch workflow #
+        # --------------- #
+        print()
+        print(
+            colored("> RUNNING <", "blue", attrs=["reverse"]),
+        )
+
+        # Pool of workers executing the units of the workflow
+        if jobs > 1:
+            pool = ProcessPoolExecutor(max_workers=jobs)
+        else:
+            pool = None
+
+        self.update_analysis()
+        self.dict_tasks = {}
+        self.checked_steps = set()
+        self.batch_units = {}
+        self.pipeline = pipeline
+        self.incremental = incremental
+
+        # Outputs shared between studies
+        if cache:
+            self.cache = OutputCache(self.cache_dir, cache_size)
+        else:
+            self.cache = None
+
+        # Studies share the workers, each one being served in turn
+        scheduler = Scheduler(fair=pool is not None)
+        self.journals = {}
+        self.resumed = set()
+
+        try:
+            for study, dict_study in self.dict_studies["config"].items():
+
+                # Check if study must be executed
+                if not dict_study["execute"]:
 
                     # Printing
                     print()
                     print(
-                        colored(f"| {study} | {this_process.name} |", "magenta"),
+                        colored(f"| {study} |", "magenta"),
                     )
+                    print()
+                    print(colored("(!) Study is skipped.", "yellow"))
 
-                    # Launch process
-                    this_process()
-                    this_process.finalize()
+                    continue
 
-                # Update workflow diagram
-                self.update_workflow_diagram(this_process)
+                # Journal of completed units (replayed in resume mode)
+                self.journals[study] = Journal(self.working_dir / study / ".journal.jsonl")
+                if resume:
+                    self.replay_journal(study)
+                self.journals[study].open(resume)
 
-                # Update paths dictonary
-                self.dict_paths[study] = this_process.dict_paths
+                self.prepare_study(study, scheduler)
 
-                # Write paths json file
-                with open(study_dir / ".paths.json", "w") as f:
-                    json.dump(self.dict_paths[study], f, indent=4)
+            # Run processes as soon as their inputs are available
+            self.run_scheduler(scheduler, pool, jobs)
 
-            # Go back to study directory
-            os.chdir(study_dir)
+        finally:
 
-            # Write diagram json file
-            with open(".diagram.json", "w") as f:
-                json.dump(self.diagram, f, indent=4)
+            # Release workers
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+            for journal in self.journals.values():
+                journal.close()
+
+            for store in self.path_stores.values():
+                store.close()
+
+        # Run is completed, journals are no longer needed
+        for journal in self.journals.values():
+            journal.remove()
 
-        # Go back to working directory
-        os.chdir(self.working_dir)
+        # Limit cache size
+        if self.cache is not None:
+            self.cache.evict()
 
         # Delete unecessary outputs
-        self.clean_outputs()
\ No newline at end of file
+        self.clean_outputs()
@@ -1,3 +1,4 @@
+import json
 from pathlib import Path
 from typing import Any
 
@@ -269,4 +270,125 @@ class Process5(Process):
         
         file = self.output_paths["out1"]
         with open(file, "w") as f:
-            f.write("")
\ No newline at end of file
+            f.write("")
+
+
+@pytest.fixture
+def ready_config_path(
+    tmp_path: Path,
+) -> Path:
+
+    app_name = "TEST_APP"
+    working_dir: Path = tmp_path / app_name
+
+    # Settings
+    dict_settings = {
+        "default_working_dir": str(tmp_path),
+        "apps": {
+            app_name: {
+                "working_dir": str(tmp_path),
+            },
+        },
+    }
+    with open(tmp_path / "settings.json", "w") as f:
+        json.dump(dict_settings, f, indent=4)
+
+    # Studies
+    outputs = ["output1.txt", "output2.txt", "output3.txt", "output4.txt", "output5", "output6.txt"]
+    dict_studies = {
+        "studies": ["Study1", "Study2"],
+        "config": {
+            "Study1": {
+                "execute": True,
+                "user_params": {
+                    "parameter1": False,
+                    "parameter2": False,
+                    "parameter3": False,
+                    "parameter4": False,
+                    "parameter5": False,
+                    "parameter6": True,
+                },
+                "user_paths": {
+                    "input1.txt": True,
+                    "input2": False,
+                    "input3.txt": False,
+                },
+                "clean_outputs": {out: False for out in outputs},
+            },
+            "Study2": {
+                "execute": True,
+                "user_params": {
+                    "parameter1": False,
+                    "parameter2": False,
+                    "parameter3": False,
+                    "parameter4": True,
+                    "parameter5": True,
+                    "parameter6": False,
+                },
+                "user_paths": {
+                    "input1.txt": False,
+                    "input2": True,
+                    "input3.txt": True,
+                },
+                "clean_outputs": {out: False for out in outputs},
+            },
+        },
+    }
+    working_dir.mkdir(parents=True)
+    with open(working_dir / "studies.json", "w") as f:
+        json.dump(dict_studies, f, indent=4)
+
+    datasets = ["Test1", "Test2", "Test3"]
+
+    # Study1 inputs
+    study_dir: Path = working_dir / "Study1"
+    (study_dir / "0_inputs" / "input2").mkdir(parents=True)
+    (study_dir / "0_inputs" / "input3.txt").write_text("")
+    for idx in datasets:
+        (study_dir / "0_inputs" / "0_datasets" / idx).mkdir(parents=True)
+        (study_dir / "0_inputs" / "0_datasets" / idx / "input1.txt").write_text("")
+    dict_inputs = {
+        "parameter1": 5.9,
+        "parameter2": 14,
+        "parameter3": "Hello",
+        "parameter4": 18.2,
+        "parameter5": True,
+        "input2": None,
+        "input3.txt": None,
+        "input1.txt": {idx: None for idx in datasets},
+    }
+    with open(study_dir / "inputs.json", "w") as f:
+        json.dump(dict_inputs, f, indent=4)
+    (study_dir / "inputs.csv").write_text(
+        "ID,parameter6,EXECUTE\n"
+        "Test1,61.2,1\n"
+        "Test2,57.9,1\n"
+        "Test3,54.1,1\n"
+    )
+
+    # Study2 inputs
+    study_dir: Path = working_dir / "Study2"
+    (study_dir / "0_inputs").mkdir(parents=True)
+    (study_dir / "0_inputs" / "input1.txt").write_text("")
+    for idx in datasets:
+        (study_dir / "0_inputs" / "0_datasets" / idx / "input2").mkdir(parents=True)
+        (study_dir / "0_inputs" / "0_datasets" / idx / "input3.txt").write_text("")
+    dict_inputs = {
+        "parameter1": 21.5,
+        "parameter2": 7,
+        "parameter3": "World",
+        "parameter6": 68.4,
+        "input1.txt": None,
+        "input2": {idx: None for idx in datasets},
+        "input3.txt": {idx: None for idx in datasets},
+    }
+    with open(study_dir / "inputs.json", "w") as f:
+        json.dump(dict_inputs, f, indent=4)
+    (study_dir / "inputs.csv").write_text(
+        "ID,parameter4,parameter5,EXECUTE\n"
+        "Test1,17.4,False,1\n"
+        "Test2,19.3,False,1\n"
+        "Test3,16.8,True,1\n"
+    )
+
+    return tmp_path
@@ -7,6 +7,7 @@ import pandas.testing as pdt
 import pytest
 
 from nuremics import Application
+from nuremics.core.paths import OutputPaths, decode_paths
 
 APP_NAME = "TEST_APP"
 
@@ -469,7 +470,8 @@ def test_state_run(
         with open(diagram_json) as f:
             dict_diagram: dict = json.load(f)
         with open(paths_json) as f:
-            dict_paths: dict = json.load(f)
+            dict_paths: dict = decode_paths(json.load(f))
+        dict_paths = {k: dict(v) if isinstance(v, OutputPaths) else v for k, v in dict_paths.items()}
         
         for proc in list_processes:
             
@@ -0,0 +1,1296 @@
+import ast
+import functools
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+import attrs
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+from conftest import Process1, Process2, Process3, Process4, Process5
+
+from nuremics import Application, BatchProcess, Process
+from nuremics.core import process as core_process
+from nuremics.core import utils as core_utils
+from nuremics.core import workflow as core_workflow
+from nuremics.core.analysis import OutputLoader
+from nuremics.core.cache import OutputCache
+from nuremics.core.paths import DatasetIndex, OutputPaths, PathStore, decode_paths, encode_paths
+from nuremics.core.scheduler import Scheduler, run_process, run_unit
+from nuremics.core.trash import Trash
+from nuremics.core.utils import dump_json, existing_paths, get_dataset_path
+
+APP_NAME = "TEST_APP"
+
+
+def run_app(
+    config_path: Path,
+    workflow: list[dict[str, Any]],
+    chdir: bool = True,
+    shard: bool = False,
+    background_delete: bool = True,
+    **kwargs: object,
+) -> Application:
+
+    app = Application(
+        app_name=APP_NAME,
+        config_path=config_path,
+        workflow=workflow,
+        chdir=chdir,
+        shard=shard,
+        background_delete=background_delete,
+    )
+    app.configure()
+    app.settings()
+    app(**kwargs)
+
+    return app
+
+
+def read_paths(
+    config_path: Path,
+    study: str,
+) -> dict:
+
+    with open(config_path / APP_NAME / study / ".paths.json") as f:
+        dict_paths = decode_paths(json.load(f))
+
+    return {k: dict(v) if isinstance(v, OutputPaths) else v for k, v in dict_paths.items()}
+
+
+def test_serial_run(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+) -> None:
+
+    run_app(ready_config_path, test_config)
+
+    study_dir: Path = ready_config_path / APP_NAME / "Study1"
+    dict_paths = read_paths(ready_config_path, "Study1")
+    assert dict_paths["output5"]["Test2"] == str(study_dir / "4_Process4/Test2/output5")
+    assert dict_paths["output6.txt"] == str(study_dir / "5_Process5/output6.txt")
+
+
+def test_parallel_datasets(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+) -> None:
+
+    run_app(ready_config_path, test_config, jobs=2)
+
+    for study in ["Study1", "Study2"]:
+        study_dir: Path = ready_config_path / APP_NAME / study
+        dict_paths = read_paths(ready_config_path, study)
+        for idx in ["Test1", "Test2", "Test3"]:
+            assert dict_paths["output3.txt"][idx] == str(study_dir / "3_Process3" / idx / "output3.txt")
+            assert Path(dict_paths["output5"][idx]).is_dir()
+
+
+@attrs.define
+class NoChdirProcess1(Process1):
+
+    def operation3(self) -> None:
+
+        # Output attributes are absolute paths when the working directory is not changed
+        with open(self.out1, "w") as f:
+            f.write("")
+
+
+@attrs.define
+class NoChdirProcess2(Process2):
+
+    def operation1(self) -> None:
+
+        with open(self.out1, "w") as f:
+            f.write("")
+
+
+@attrs.define
+class NoChdirProcess3(Process3):
+
+    def operation2(self) -> None:
+
+        with open(self.out1, "w") as f:
+            f.write("")
+
+    def operation4(self) -> None:
+
+        with open(self.out2, "w") as f:
+            f.write("")
+
+
+@attrs.define
+class NoChdirProcess4(Process4):
+
+    def operation2(self) -> None:
+
+        self.out1.mkdir(
+            exist_ok=True,
+            parents=True,
+        )
+
+
+@attrs.define
+class NoChdirProcess5(Process5):
+
+    def operation1(self) -> None:
+
+        with open(self.out1, "w") as f:
+            f.write("")
+
+
+def test_no_chdir(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+) -> None:
+
+    processes = [NoChdirProcess1, NoChdirProcess2, NoChdirProcess3, NoChdirProcess4, NoChdirProcess5]
+    for proc, process in zip(test_config, processes):
+        proc["process"] = process
+
+    cwd = os.getcwd()
+    run_app(ready_config_path, test_config, chdir=False)
+    assert os.getcwd() == cwd
+
+    study_dir: Path = ready_config_path / APP_NAME / "Study1"
+    dict_paths = read_paths(ready_config_path, "Study1")
+    assert Path(dict_paths["output1.txt"]["Test1"]).is_file()
+    assert Path(dict_paths["output6.txt"]).is_file()
+    with open(study_dir / "1_NoChdirProcess1" / "Test1" / "inputs.json") as f:
+        assert json.load(f)["out1"] == str(study_dir / "1_NoChdirProcess1" / "Test1" / "output1.txt")
+
+    # Output entries stay relative when the working directory is changed
+    run_app(ready_config_path, test_config)
+    with open(study_dir / "1_NoChdirProcess1" / "Test1" / "inputs.json") as f:
+        assert json.load(f)["out1"] == "output1.txt"
+
+
+def test_workflow_graph(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+) -> None:
+
+    app = run_app(ready_config_path, test_config, jobs=2)
+
+    upstream = [app.workflow.get_upstream_steps(step) for step in range(len(test_config))]
+    assert upstream == [[], [0], [1], [2], [3]]
+
+
+def test_scheduler_branches() -> None:
+
+    # Two processes consuming the outputs of the same upstream process
+    scheduler = Scheduler()
+    scheduler.add(("Study", 0, None), [])
+    scheduler.add(("Study", 0), [("Study", 0, None)], barrier=True)
+    scheduler.add(("Study", 1, None), [("Study", 0)])
+    scheduler.add(("Study", 1), [("Study", 1, None)], barrier=True)
+    scheduler.add(("Study", 2, None), [("Study", 0)])
+    scheduler.add(("Study", 2), [("Study", 2, None)], barrier=True)
+
+    assert scheduler.start() == []
+    assert scheduler.pop_ready() == [("Study", 0, None)]
+    assert scheduler.complete(("Study", 0, None)) == [("Study", 0)]
+    assert scheduler.pop_ready() == [("Study", 1, None), ("Study", 2, None)]
+    assert scheduler.complete(("Study", 2, None)) == [("Study", 2)]
+    assert not scheduler.is_finished()
+    assert scheduler.complete(("Study", 1, None)) == [("Study", 1)]
+    assert scheduler.is_finished()
+
+
+def test_pipelined_run(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+
+    studies_file: Path = ready_config_path / APP_NAME / "studies.json"
+    with open(studies_file) as f:
+        dict_studies = json.load(f)
+    dict_studies["config"]["Study1"]["clean_outputs"]["output1.txt"] = True
+    with open(studies_file, "w") as f:
+        json.dump(dict_studies, f, indent=4)
+
+    run_app(ready_config_path, test_config, pipeline=True)
+
+    # First dataset goes through the whole workflow before the next one starts
+    out = capsys.readouterr().out
+    assert out.index("| Study1 | Process4 | Test1 |") < out.index("| Study1 | Process1 | Test2 |")
+
+    dict_paths = read_paths(ready_config_path, "Study1")
+    for idx in ["Test1", "Test2", "Test3"]:
+        assert not Path(dict_paths["output1.txt"][idx]).exists()
+        assert Path(dict_paths["output5"][idx]).is_dir()
+    assert Path(dict_paths["output6.txt"]).is_file()
+
+
+def test_scheduler_fair() -> None:
+
+    # A large study must not hold back a small one
+    scheduler = Scheduler(fair=True)
+    for idx in range(10):
+        scheduler.add(("Large", 0, idx), [])
+    scheduler.add(("Small", 0, 0), [])
+    scheduler.start()
+
+    assert scheduler.nb_ready() == 11
+    assert scheduler.pop_ready(limit=2) == [("Large", 0, 0), ("Small", 0, 0)]
+    assert scheduler.pop_ready(limit=1) == [("Large", 0, 1)]
+
+
+def test_scheduler_fair_rotation() -> None:
+
+    # Groups are served in turn across calls handing out several units
+    scheduler = Scheduler(fair=True)
+    for group in ["A", "B", "C"]:
+        for idx in range(10):
+            scheduler.add((group, 0, idx), [])
+    scheduler.start()
+
+    served = [unit[0] for _ in range(6) for unit in scheduler.pop_ready(limit=2)]
+    assert served == ["A", "B", "C", "A", "B", "C", "A", "B", "C", "A", "B", "C"]
+
+
+def test_concurrent_studies(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+    capfd: pytest.CaptureFixture[str],
+) -> None:
+
+    run_app(ready_config_path, test_config)
+    expected = {study: read_paths(ready_config_path, study) for study in ["Study1", "Study2"]}
+    capfd.readouterr()
+
+    # Studies share the workers (units of both studies are in flight together)
+    run_app(ready_config_path, test_config, jobs=3)
+    out = capfd.readouterr().out
+    assert out.index("| Study2 | Process1 |") < out.index("| Study1 | Process5 |")
+
+    for study in ["Study1", "Study2"]:
+        dict_paths = read_paths(ready_config_path, study)
+        assert dict_paths == expected[study]
+        for value in dict_paths.values():
+            for path in (value.values() if isinstance(value, dict) else [value]):
+                assert (path is None) or Path(path).exists()
+
+
+def test_incremental_run(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+    capfd: pytest.CaptureFixture[str],
+) -> None:
+
+    run_app(ready_config_path, test_config, incremental=True)
+    out = capfd.readouterr().out
+    assert "(!) Outputs are up to date." not in out
+
+    study_dir: Path = ready_config_path / APP_NAME / "Study1"
+    assert (study_dir / ".fingerprints.json").is_file()
+
+    # Nothing changed (paths json file not rewritten)
+    stat = (study_dir / ".paths.json").stat()
+    run_app(ready_config_path, test_config, incremental=True)
+    out = capfd.readouterr().out
+    assert out.count("(!) Outputs are up to date.") == 24
+    assert (study_dir / ".paths.json").stat().st_ino == stat.st_ino
+
+    # A variable parameter of Process4 changed for a single dataset
+    inputs_csv: Path = study_dir / "inputs.csv"
+    inputs_csv.write_text(inputs_csv.read_text().replace("57.9", "58.0"))
+
+    # (its outputs and the downstream analysis are invalidated)
+    run_app(ready_config_path, test_config, incremental=True, jobs=2)
+    out = capfd.readouterr().out
+    assert out.count("COMPLETED <<<") == 2
+    assert out.count("(!) Outputs are up to date.") == 22
+
+
+def test_output_cache(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+    capfd: pytest.CaptureFixture[str],
+) -> None:
+
+    # Study2 uses the same fixed parameters for Process1 as Study1 for all its datasets
+    studies_file: Path = ready_config_path / APP_NAME / "studies.json"
+    with open(studies_file) as f:
+        dict_studies = json.load(f)
+    dict_studies["config"]["Study1"]["user_paths"]["input1.txt"] = False
+    with open(studies_file, "w") as f:
+        json.dump(dict_studies, f, indent=4)
+    study_dir: Path = ready_config_path / APP_NAME / "Study1"
+    with open(study_dir / "inputs.json") as f:
+        dict_inputs = json.load(f)
+    dict_inputs.update({"parameter1": 21.5, "parameter2": 7, "parameter3": "World", "input1.txt": None})
+    with open(study_dir / "inputs.json", "w") as f:
+        json.dump(dict_inputs, f, indent=4)
+    (study_dir / "0_inputs" / "input1.txt").write_text("")
+
+    run_app(ready_config_path, test_config, cache=True)
+    out = capfd.readouterr().out
+    assert "| Study2 | Process1 |\n\n(!) Outputs are restored from cache." in out
+
+    cache_dir: Path = ready_config_path / APP_NAME / ".cache"
+    assert (cache_dir / "Process1").is_dir()
+    dict_paths = read_paths(ready_config_path, "Study2")
+    assert Path(dict_paths["output1.txt"]).is_file()
+
+    # Eviction down to an empty cache
+    run_app(ready_config_path, test_config, cache=True, cache_size=0)
+    assert cache_dir.is_dir()
+    assert len(list((cache_dir / "Process1").iterdir())) == 0
+
+
+@attrs.define
+class WriteProcess(Process):
+
+    # Parameters
+    param1: float = attrs.field(init=False, metadata={"input": True})
+
+    # Outputs
+    out1: Path = attrs.field(init=False, metadata={"output": True}, converter=Path)
+
+    def __call__(self) -> None:
+        super().__call__()
+
+        self.operation1()
+
+    def operation1(self) -> None:
+
+        with open(self.out1, "a") as f:
+            f.write(str(self.param1))
+
+
+def test_output_cache_links(
+    tmp_path: Path,
+) -> None:
+
+    def run(value: float, cache: OutputCache, trash: Trash = None) -> None:
+        process = WriteProcess(
+            dict_user_params={"parameter1": value},
+            params={"param1": "parameter1"},
+            output_paths={"out1": "output.txt"},
+            fixed_params=["parameter1"],
+            variable_params=[],
+            fixed_paths=[],
+            variable_paths=[],
+        )
+        process.name = "WriteProcess"
+        process.initialize()
+        run_unit(process, None, tmp_path / "study", cache=cache, trash=trash)
+
+    # Output stored in cache, then restored from it, is a hardlink to the cache entry
+    cache = OutputCache(tmp_path / ".cache")
+    run(1.0, cache)
+    (entry,) = (tmp_path / ".cache" / "WriteProcess").iterdir()
+    assert (tmp_path / "study" / "output.txt").samefile(entry / "output.txt")
+    run(1.0, cache)
+    assert (tmp_path / "study" / "output.txt").samefile(entry / "output.txt")
+
+    # A later run without cache does not write through the link (moved to the trash)
+    trash = Trash(tmp_path / ".trash")
+    run(2.0, None, trash)
+    trash.wait()
+    assert (tmp_path / "study" / "output.txt").read_text() == "2.0"
+    assert (entry / "output.txt").read_text() == "1.0"
+    assert (tmp_path / ".trash").is_dir()
+
+    # Outputs which are not linked are left in place
+    run(3.0, None, trash)
+    assert (tmp_path / "study" / "output.txt").read_text() == "2.03.0"
+
+
+def test_invalidate_processes(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+) -> None:
+
+    run_app(ready_config_path, test_config)
+
+    # parameter6 (only used by Process4) becomes fixed
+    studies_file: Path = ready_config_path / APP_NAME / "studies.json"
+    with open(studies_file) as f:
+        dict_studies = json.load(f)
+    dict_studies["config"]["Study1"]["user_params"]["parameter6"] = False
+    with open(studies_file, "w") as f:
+        json.dump(dict_studies, f, indent=4)
+
+    study_dir: Path = ready_config_path / APP_NAME / "Study1"
+    with open(study_dir / "inputs.json") as f:
+        dict_inputs = json.load(f)
+    dict_inputs["parameter6"] = 60.0
+    with open(study_dir / "inputs.json", "w") as f:
+        json.dump(dict_inputs, f, indent=4)
+
+    app = Application(
+        app_name=APP_NAME,
+        config_path=ready_config_path,
+        workflow=test_config,
+    )
+    app.configure()
+
+    # Process4 and the analysis of its outputs (Process5) are invalidated
+    assert (study_dir / "3_Process3" / "Test1" / "output3.txt").is_file()
+    assert not (study_dir / "4_Process4").exists()
+    assert not (study_dir / "5_Process5").exists()
+
+    dict_paths = read_paths(ready_config_path, "Study1")
+    assert dict_paths["output5"] is None
+    assert dict_paths["output6.txt"] is None
+    assert isinstance(dict_paths["output3.txt"], dict)
+
+    # Untouched study
+    assert (ready_config_path / APP_NAME / "Study2" / "4_Process4").is_dir()
+
+    app.settings()
+    app()
+    dict_paths = read_paths(ready_config_path, "Study1")
+    assert Path(dict_paths["output6.txt"]).is_file()
+
+
+def test_invalidate_datasets(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+) -> None:
+
+    run_app(ready_config_path, test_config)
+
+    study_dir: Path = ready_config_path / APP_NAME / "Study2"
+
+    # A variable parameter (parameter5 used by Process3) changed for a single dataset
+    inputs_csv: Path = study_dir / "inputs.csv"
+    inputs_csv.write_text(inputs_csv.read_text().replace("Test2,19.3,False", "Test2,19.3,True"))
+
+    # A fixed parameter used by Process4 only
+    with open(study_dir / "inputs.json") as f:
+        dict_inputs = json.load(f)
+    dict_inputs["parameter6"] = 70.1
+    with open(study_dir / "inputs.json", "w") as f:
+        json.dump(dict_inputs, f, indent=4)
+
+    app = Application(
+        app_name=APP_NAME,
+        config_path=ready_config_path,
+        workflow=test_config,
+    )
+    app.configure()
+    app.settings()
+
+    assert (study_dir / "2_Process2" / "Test2").is_dir()
+    assert (study_dir / "3_Process3" / "Test1").is_dir()
+    assert not (study_dir / "3_Process3" / "Test2").exists()
+    assert not (study_dir / "4_Process4").exists()
+    assert not (study_dir / "5_Process5").exists()
+
+    dict_paths = read_paths(ready_config_path, "Study2")
+    assert "Test2" not in dict_paths["output3.txt"]
+    assert dict_paths["output5"] is None
+
+    # Untouched study
+    assert (ready_config_path / APP_NAME / "Study1" / "4_Process4" / "Test2").is_dir()
+
+
+def test_resume(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+    capfd: pytest.CaptureFixture[str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+
+    study_dir: Path = ready_config_path / APP_NAME / "Study1"
+
+    # Run interrupted on the last dataset of Process4
+    def crash(process: Process, indices: list, *args: object) -> dict:
+        if (process.name == "Process4") and (indices == ["Test3"]):
+            raise RuntimeError("Crash")
+        return run_process(process, indices, *args)
+
+    monkeypatch.setattr(core_workflow, "run_process", crash)
+    with pytest.raises(RuntimeError):
+        run_app(ready_config_path, test_config)
+
+    with open(study_dir / ".journal.jsonl") as f:
+        records = [json.loads(line) for line in f]
+    assert {"process": "Process4", "dataset": "Test2"} == {k: records[-1][k] for k in ["process", "dataset"]}
+
+    # Truncated record left by the crash
+    with open(study_dir / ".journal.jsonl", "a") as f:
+        f.write('{"process": "Process4", "dat')
+
+    monkeypatch.undo()
+    capfd.readouterr()
+    run_app(ready_config_path, test_config, resume=True)
+    out = capfd.readouterr().out
+    assert out.count("(!) Outputs are resumed from journal.") == len(records)
+    assert out.count("COMPLETED <<<") == 24 - len(records)
+    assert not (study_dir / ".journal.jsonl").exists()
+
+    dict_paths = read_paths(ready_config_path, "Study1")
+    assert dict_paths["output5"]["Test1"] == str(study_dir / "4_Process4/Test1/output5")
+    assert dict_paths["output5"]["Test3"] == str(study_dir / "4_Process4/Test3/output5")
+
+
+def test_required_paths(
+    tmp_path: Path,
+) -> None:
+
+    for idx in ["Test1", "Test2"]:
+        (tmp_path / idx).mkdir()
+        (tmp_path / idx / "output.txt").touch()
+
+    dict_paths = {
+        "output.txt": {idx: str(tmp_path / idx / "output.txt") for idx in ["Test1", "Test2", "Test3"]},
+        "output": str(tmp_path / "Test1"),
+    }
+    process = Process(
+        dict_paths=dict_paths,
+        required_paths={"path1": "output.txt", "path2": "output"},
+    )
+
+    process.check_required_paths(["Test1", "Test2"])
+    process.index = "Test2"
+    assert process.get_output_path("output.txt") == dict_paths["output.txt"]["Test2"]
+    assert process.get_output_path("output") == dict_paths["output"]
+
+    with pytest.raises(SystemExit):
+        process.check_required_paths(["Test3"])
+
+    # Checked paths are not checked again until they are reset
+    os.remove(dict_paths["output.txt"]["Test1"])
+    process.check_required_paths(["Test1"])
+    process.checked_paths = set()
+    with pytest.raises(SystemExit):
+        process.check_required_paths(["Test1"])
+
+
+@pytest.mark.parametrize("pipeline", [False, True])
+def test_required_paths_by_step(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+    monkeypatch: pytest.MonkeyPatch,
+    pipeline: bool,
+) -> None:
+
+    calls = []
+
+    def counting_paths(paths: list, *args: object) -> set:
+        calls.append(len(paths))
+        return existing_paths(paths, *args)
+    monkeypatch.setattr(core_process, "existing_paths", counting_paths)
+
+    app = run_app(ready_config_path, test_config, pipeline=pipeline)
+    tasks = [task for task in app.workflow.dict_tasks.values() if task["execute"] and task["process"].required_paths]
+
+    # Required paths are checked once by process step in serial mode, by unit in pipelined mode
+    if pipeline:
+        assert len(calls) > len(tasks)
+    else:
+        assert len(calls) == sum(len(task["process"].required_paths) for task in tasks)
+
+
+@pytest.mark.parametrize("background_delete", [False, True])
+def test_purge_output_datasets(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+    background_delete: bool,
+) -> None:
+
+    run_app(ready_config_path, test_config)
+
+    # Outputs of a dataset which no longer exists
+    study_dir: Path = ready_config_path / APP_NAME / "Study1"
+    (study_dir / "3_Process3" / "Test4").mkdir()
+    (study_dir / "3_Process3" / "Test4" / "output3.txt").touch()
+
+    app = run_app(ready_config_path, test_config, background_delete=background_delete)
+
+    assert sorted(os.listdir(study_dir / "3_Process3")) == ["Test1", "Test2", "Test3"]
+
+    # Trash emptied in the background
+    app.wait_deletions()
+    trash_dir: Path = ready_config_path / APP_NAME / ".trash"
+    assert (not trash_dir.exists()) or (os.listdir(trash_dir) == [])
+
+
+def test_analysis_state(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+) -> None:
+
+    app = run_app(ready_config_path, test_config)
+    analysis_file: Path = ready_config_path / APP_NAME / "Study1" / "analysis.json"
+    mtime = analysis_file.stat().st_mtime_ns
+
+    # Unchanged settings are not written again
+    app()
+    assert analysis_file.stat().st_mtime_ns == mtime
+
+    # Settings edited on disk are reloaded
+    with open(analysis_file) as f:
+        dict_analysis = json.load(f)
+    dict_analysis["Process5"]["Test1"] = {"setting": 1}
+    with open(analysis_file, "w") as f:
+        json.dump(dict_analysis, f, indent=4)
+
+    app()
+    assert app.workflow.dict_analysis["Study1"]["Process5"]["Test1"] == {"setting": 1}
+
+
+def test_analysis_update_by_step(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+
+    analysis_file: Path = ready_config_path / APP_NAME / "Study1" / "analysis.json"
+    settings = {}
+
+    # Settings of Process5 edited on disk by a previous step
+    def edit_analysis(process: Process, *args: object) -> dict:
+        if (process.study == "Study1") and (process.name == "Process4") and (len(settings) == 0):
+            with open(analysis_file) as f:
+                dict_analysis = json.load(f)
+            dict_analysis["Process5"]["Test1"] = {"setting": 1}
+            dump_json(analysis_file, dict_analysis)
+        if (process.study == "Study1") and (process.name == "Process5"):
+            settings.update(process.dict_analysis["Process5"])
+        return run_process(process, *args)
+    monkeypatch.setattr(core_workflow, "run_process", edit_analysis)
+
+    run_app(ready_config_path, test_config)
+    assert settings["Test1"] == {"setting": 1}
+
+
+def test_path_store(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+) -> None:
+
+    run_app(ready_config_path, test_config, jobs=2)
+
+    study_dir: Path = ready_config_path / APP_NAME / "Study1"
+    store = PathStore(study_dir / ".paths.db")
+    assert store.load() == read_paths(ready_config_path, "Study1")
+
+    # Paths following the output template are not stored
+    assert store.connect().execute("SELECT COUNT(*) FROM overrides").fetchone()[0] == 0
+
+    # Partial loading
+    dict_paths = store.load(["output3.txt", "output6.txt"], ["Test2"])
+    assert dict_paths == {
+        "output3.txt": {"Test2": str(study_dir / "3_Process3/Test2/output3.txt")},
+        "output6.txt": str(study_dir / "5_Process5/output6.txt"),
+    }
+
+    # Stored paths are left untouched
+    assert not store.update({"output3.txt": {"Test2": str(study_dir / "3_Process3/Test2/output3.txt")}})
+    assert not store.update({"output6.txt": str(study_dir / "5_Process5/output6.txt")})
+
+    # Incremental update
+    assert store.update({"output3.txt": {"Test2": None}})
+    assert store.load(["output3.txt"])["output3.txt"]["Test1"] == str(study_dir / "3_Process3/Test1/output3.txt")
+    assert store.load(["output3.txt"])["output3.txt"]["Test2"] is None
+
+    # Outputs are updated in place (their order is kept) and loaded with the stored bitmaps over a shared index
+    order = list(store.load())
+    store.update({"output3.txt": {"Test2": str(study_dir / "3_Process3/Test2/output3.txt")}, order[0]: None})
+    dict_paths = store.load()
+    assert list(dict_paths) == order
+    assert dict_paths["output3.txt"].overrides == {}
+    assert dict_paths["output3.txt"].index is dict_paths["output5"].index
+    store.close()
+
+
+def test_output_paths() -> None:
+
+    output_paths = OutputPaths()
+    for i in range(1000):
+        output_paths[f"Test{i}"] = os.path.join("study", "3_Process3", f"Test{i}", "output3.txt")
+    output_paths["Test5"] = None
+    output_paths["Other"] = "other.txt"
+
+    assert output_paths.prefix == os.path.join("study", "3_Process3", "")
+    assert output_paths.suffix == os.sep + "output3.txt"
+    assert output_paths["Test999"] == os.path.join("study", "3_Process3", "Test999", "output3.txt")
+    assert output_paths.get_overrides() == {"Test5": None, "Other": "other.txt"}
+    assert len(output_paths.get_template_datasets()) == 999
+
+    # Only the paths which do not follow the template are stored, others being a bit by dataset
+    assert output_paths.overrides == {"Test5": None, "Other": "other.txt"}
+    assert len(output_paths.bitmap) == 125
+    assert len(output_paths) == 1001
+
+    del output_paths["Test999"]
+    assert "Test999" not in output_paths
+    assert len(output_paths) == 1000
+    assert dict(OutputPaths.from_dict(dict(output_paths))) == dict(output_paths)
+
+    # Index of the datasets shared by the outputs of a study
+    other_paths = OutputPaths.from_dict({idx: os.path.join("study", "4_Process4", idx, "output5") for idx in ["Test1", "Test2"]}, output_paths.index)
+    assert other_paths.index is output_paths.index
+    assert len(output_paths.index) == 1000
+    assert other_paths.get_template_datasets() == ["Test1", "Test2"]
+
+
+def test_paths_file(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+    tmp_path: Path,
+) -> None:
+
+    run_app(ready_config_path, test_config)
+
+    # Templates and bitmaps of the outputs in the paths json file
+    with open(ready_config_path / APP_NAME / "Study1" / ".paths.json") as f:
+        data = json.load(f)
+    assert data["datasets"] == ["Test1", "Test2", "Test3"]
+    assert data["outputs"]["output3.txt"]["prefix"] == str(ready_config_path / APP_NAME / "Study1" / "3_Process3") + os.sep
+    assert data["outputs"]["output3.txt"]["overrides"] == {}
+
+    # Large study: size independent of the number of paths following the templates
+    datasets = [f"Test{i}" for i in range(20000)]
+    index = DatasetIndex(datasets)
+    dict_paths = {"output6.txt": str(tmp_path / "5_Process5" / "output6.txt")}
+    for i, output in enumerate(["output1.txt", "output2.txt", "output3.txt", "output4.txt", "output5"]):
+        dict_paths[output] = OutputPaths.from_dict({idx: str(tmp_path / f"{i + 1}_Process" / idx / output) for idx in datasets}, index)
+    dict_paths["output3.txt"]["Test5"] = None
+
+    dump_json(tmp_path / ".paths.json", encode_paths(dict_paths))
+    expanded = {k: dict(v) if isinstance(v, OutputPaths) else v for k, v in dict_paths.items()}
+    assert (tmp_path / ".paths.json").stat().st_size * 20 < len(json.dumps(expanded, indent=4))
+
+    with open(tmp_path / ".paths.json") as f:
+        loaded = decode_paths(json.load(f))
+    assert {k: dict(v) if isinstance(v, OutputPaths) else v for k, v in loaded.items()} == expanded
+
+    # Paths json file of previous versions (one path by dataset)
+    assert {k: dict(v) if isinstance(v, OutputPaths) else v for k, v in decode_paths(expanded).items()} == expanded
+
+
+def test_introspection_cache(
+    shared_tmp_path: Path,
+    test_config: list[dict[str, Any]],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+
+    config_path: Path = shared_tmp_path / "introspection"
+    app = Application(
+        app_name=APP_NAME,
+        config_path=config_path,
+        workflow=test_config,
+    )
+    assert (config_path / ".introspection.json").is_file()
+    assert app.workflow.operations_by_process["Process4"] == ["operation1", "operation2"]
+
+    # Unchanged process classes are not parsed again
+    def parse(*args: object, **kwargs: object) -> None:
+        raise AssertionError("Source parsed")
+
+    monkeypatch.setattr(ast, "parse", parse)
+    app = Application(
+        app_name=APP_NAME,
+        config_path=config_path,
+        workflow=test_config,
+    )
+    assert app.workflow.operations_by_process["Process4"] == ["operation1", "operation2"]
+    assert "param1" in app.workflow.inputs_by_process["Process4"]
+    assert app.workflow.outputs_by_process["Process4"] == ["out1"]
+    monkeypatch.undo()
+
+    # Only the analysis of the current source of each class is kept
+    with open(config_path / ".introspection.json") as f:
+        cache = json.load(f)
+    name = f"{Process4.__module__}.{Process4.__qualname__}"
+    cache[name] = {**cache[name], "key": "former", "operations": []}
+    cache["0123456789abcdef"] = {"operations": [], "valid_call": True}
+    with open(config_path / ".introspection.json", "w") as f:
+        json.dump(cache, f)
+
+    app = Application(
+        app_name=APP_NAME,
+        config_path=config_path,
+        workflow=test_config,
+    )
+    assert app.workflow.operations_by_process["Process4"] == ["operation1", "operation2"]
+    with open(config_path / ".introspection.json") as f:
+        cache = json.load(f)
+    assert sorted(cache) == sorted(f"{proc['process'].__module__}.{proc['process'].__qualname__}" for proc in test_config)
+    assert cache[name]["key"] != "former"
+
+
+def test_deprecated_introspection() -> None:
+
+    # Former helpers still give the same results, with a warning
+    process = Process4()
+    with pytest.warns(DeprecationWarning):
+        assert core_utils.get_self_method_calls(Process4) == ["operation1", "operation2"]
+    with pytest.warns(DeprecationWarning):
+        assert core_utils.only_function_calls(Process4.__call__, ["operation1", "operation2"])
+    with pytest.warns(DeprecationWarning):
+        assert core_utils.extract_outputs(process) == ["out1"]
+    with pytest.warns(DeprecationWarning):
+        assert list(core_utils.extract_inputs_and_types(process)) == list(core_utils.introspect_process(Process4)["inputs"])
+    with pytest.warns(DeprecationWarning):
+        assert core_utils.extract_analysis(process) == []
+
+
+def test_settings_snapshot(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+
+    def settings() -> Application:
+        app = Application(
+            app_name=APP_NAME,
+            config_path=ready_config_path,
+            workflow=test_config,
+        )
+        app.configure()
+        app.settings()
+        return app
+
+    app = settings()
+    dict_user_paths = app.workflow.dict_user_paths
+    assert (ready_config_path / APP_NAME / ".settings.pkl").is_file()
+
+    # Unchanged inputs are restored without being read again
+    def set_inputs(self: core_workflow.WorkFlow) -> None:
+        raise AssertionError("Inputs read")
+
+    monkeypatch.setattr(core_workflow.WorkFlow, "set_inputs", set_inputs)
+    app = settings()
+    assert app.workflow.dict_user_paths == dict_user_paths
+    pdt.assert_frame_equal(app.workflow.dict_variable_params["Study1"], pd.read_csv(ready_config_path / APP_NAME / "Study1" / "inputs.csv", index_col=0))
+
+    # Modified inputs are read again
+    monkeypatch.undo()
+    inputs_csv: Path = ready_config_path / APP_NAME / "Study1" / "inputs.csv"
+    inputs_csv.write_text(inputs_csv.read_text().replace("Test2,57.9", "Test2,58.0"))
+    monkeypatch.setattr(core_workflow.WorkFlow, "set_inputs", set_inputs)
+    with pytest.raises(AssertionError, match="Inputs read"):
+        settings()
+
+    # Snapshot written by another version of the package
+    monkeypatch.undo()
+    settings()
+    monkeypatch.setattr(core_workflow.WorkFlow, "set_inputs", set_inputs)
+    monkeypatch.setattr(core_workflow, "NUREMICS_VERSION", "0.0.0")
+    with pytest.raises(AssertionError, match="Inputs read"):
+        settings()
+
+
+def test_inputs_validation(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+) -> None:
+
+    study_dir: Path = ready_config_path / APP_NAME / "Study2"
+    (study_dir / "inputs.csv").write_text(
+        "ID,parameter4,parameter5,EXECUTE\n"
+        "Test1,17.4,False,1\n"
+        "Test2,19.3,False,1\n"
+        "Test3,,True,1\n"
+        "Test4,16.8,True,1\n"
+    )
+    for idx in ["Test4"]:
+        (study_dir / "0_inputs" / "0_datasets" / idx / "input2").mkdir(parents=True)
+        (study_dir / "0_inputs" / "0_datasets" / idx / "input3.txt").write_text("")
+    (study_dir / "0_inputs" / "0_datasets" / "Test1" / "input3.txt").unlink()
+
+    app = Application(
+        app_name=APP_NAME,
+        config_path=ready_config_path,
+        workflow=test_config,
+    )
+    app.configure()
+    app.workflow.set_inputs()
+    app.workflow.test_inputs_settings()
+
+    # Messages are only stored for the datasets with errors
+    assert app.workflow.variable_params_messages["Study2"] == {
+        "Test1": ["(V) parameter4", "(V) parameter5"],
+        "Test3": ["(X) parameter4", "(V) parameter5"],
+    }
+    assert app.workflow.variable_paths_messages["Study2"]["Test1"] == ["(V) input2", "(X) input3.txt"]
+    assert app.workflow.get_variable_messages("Study2", "Test4") == (
+        ["(V) parameter4", "(V) parameter5"],
+        ["(V) input2", "(V) input3.txt"],
+    )
+
+    with pytest.raises(SystemExit):
+        app.workflow.print_inputs_settings()
+
+    # Types of mixed values
+    column = pd.Series([1.5, "a", np.float64(2.0), True, 3], dtype=object)
+    assert app.workflow.get_valid_types_mask(column, float).tolist() == [True, False, True, False, False]
+    assert app.workflow.get_valid_types_mask(column, int).tolist() == [False, False, False, True, True]
+
+    # Cells without value are skipped, as by the former per-cell checks (reported as missing only)
+    column = pd.Series([1.5, "", np.nan, "a"], dtype=object)
+    skipped = np.array([False, True, True, False])
+    assert app.workflow.get_valid_types_mask(column, float, skipped).tolist() == [True, True, True, False]
+    assert app.workflow.get_valid_types_mask(pd.Series([1.0, np.nan]), int, np.array([False, True])).tolist() == [False, True]
+
+
+def test_existing_paths(
+    tmp_path: Path,
+) -> None:
+
+    paths = []
+    for i in range(100):
+        (tmp_path / f"Test{i}").mkdir()
+        (tmp_path / f"Test{i}" / "input1.txt").touch()
+        paths += [tmp_path / f"Test{i}" / "input1.txt", tmp_path / f"Test{i}" / "input2"]
+    paths += [tmp_path / "missing" / "input3.txt", tmp_path / "Test0"]
+
+    expected = {str(p) for p in paths if p.exists()}
+    assert existing_paths(paths) == expected
+    assert existing_paths(paths, max_workers=1) == expected
+
+
+def test_parameter_records(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+) -> None:
+
+    app = run_app(ready_config_path, test_config)
+    assert app.workflow.dict_records["Study2"]["Test2"] == {"parameter4": 19.3, "parameter5": False}
+
+    # Process3 takes parameter2 (fixed), parameter4 and parameter5 (variable) in Study2
+    with open(ready_config_path / APP_NAME / "Study2" / "3_Process3" / "Test3" / "inputs.json") as f:
+        dict_inputs = json.load(f)
+    assert [dict_inputs[param] for param in ["param1", "param2", "param3"]] == [7, 16.8, True]
+
+    # Parameters dataframe of the process (variable and fixed parameters)
+    process = app.workflow.dict_tasks[("Study2", 2)]["process"]
+    assert list(process.df_params.columns) == ["parameter4", "parameter5", "parameter2"]
+    assert process.df_params.at["Test3", "parameter4"] == 16.8
+
+    # Columns are cast to the types of the parameters (float values written as integers)
+    inputs_csv: Path = ready_config_path / APP_NAME / "Study2" / "inputs.csv"
+    inputs_csv.write_text(inputs_csv.read_text().replace("19.3", "19"))
+    app = run_app(ready_config_path, test_config)
+    assert app.workflow.dict_variable_params["Study2"]["parameter4"].dtype == float
+    assert isinstance(app.workflow.dict_records["Study2"]["Test2"]["parameter4"], float)
+
+
+def test_cast_variable_params(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+) -> None:
+
+    app = Application(
+        app_name=APP_NAME,
+        config_path=ready_config_path,
+        workflow=test_config,
+    )
+    app.configure()
+
+    # Integers with a missing value (read as floats), floats written as integers
+    workflow = app.workflow
+    workflow.params_type["parameter5"] = (int, "int")
+    workflow.dict_variable_params["Study2"] = pd.DataFrame(
+        {"parameter4": [1, 2, 3], "parameter5": [1.0, np.nan, 3.0]},
+        index=["Test1", "Test2", "Test3"],
+    )
+    workflow.cast_variable_params("Study2")
+    records = workflow.get_records("Study2")
+    assert records == {
+        "Test1": {"parameter4": 1.0, "parameter5": 1},
+        "Test2": {"parameter4": 2.0, "parameter5": None},
+        "Test3": {"parameter4": 3.0, "parameter5": 3},
+    }
+    assert isinstance(records["Test1"]["parameter4"], float)
+    assert isinstance(records["Test1"]["parameter5"], int)
+
+
+def test_reconcile_datasets_tree(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+) -> None:
+
+    def configure() -> None:
+        app = Application(
+            app_name=APP_NAME,
+            config_path=ready_config_path,
+            workflow=test_config,
+        )
+        app.configure()
+
+    configure()
+    datasets_dir: Path = ready_config_path / APP_NAME / "Study2" / "0_inputs" / "0_datasets"
+    assert (datasets_dir / ".tree.json").is_file()
+
+    # Test3 removed and Test4 added (in place of a file of the same name)
+    (ready_config_path / APP_NAME / "Study2" / "inputs.csv").write_text(
+        "ID,parameter4,parameter5,EXECUTE\n"
+        "Test1,17.4,False,1\n"
+        "Test2,19.3,False,1\n"
+        "Test4,16.8,True,1\n"
+    )
+    (datasets_dir / "Test4").write_text("")
+    (datasets_dir / "Test1" / "notes.txt").write_text("")
+    configure()
+
+    assert sorted(p.name for p in datasets_dir.iterdir() if p.is_dir()) == ["Test1", "Test2", "Test4"]
+    assert (datasets_dir / "Test1" / "input3.txt").is_file()
+
+    # Stray entries of kept datasets are only deleted when the variable paths change
+    assert (datasets_dir / "Test1" / "notes.txt").is_file()
+
+
+def test_sharded_layout(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+) -> None:
+
+    run_app(ready_config_path, test_config)
+    expected = read_paths(ready_config_path, "Study1")
+
+    run_app(ready_config_path, test_config, jobs=2, shard=True)
+
+    # Datasets folders are sharded, paths follow the sharded template
+    study_dir: Path = ready_config_path / APP_NAME / "Study1"
+    process_dir: Path = study_dir / "3_Process3"
+    assert get_dataset_path(process_dir, "Test1", shard=True).parent.parent.parent == process_dir
+    assert read_paths(ready_config_path, "Study1")["output3.txt"] == {
+        idx: str(get_dataset_path(process_dir, idx, shard=True) / "output3.txt") for idx in ["Test1", "Test2", "Test3"]
+    }
+    assert not (process_dir / "Test1").exists()
+    store = PathStore(study_dir / ".paths.db")
+    assert store.connect().execute("SELECT COUNT(*) FROM overrides").fetchone()[0] == 0
+    store.close()
+
+    # Inputs folders of the datasets are moved along
+    datasets_dir: Path = ready_config_path / APP_NAME / "Study2" / "0_inputs" / "0_datasets"
+    assert (get_dataset_path(datasets_dir, "Test1", shard=True) / "input3.txt").is_file()
+    assert not (datasets_dir / "Test1").exists()
+
+    # Back to the flat layout
+    run_app(ready_config_path, test_config, shard=False)
+    assert read_paths(ready_config_path, "Study1") == expected
+    assert sorted(os.listdir(process_dir)) == ["Test1", "Test2", "Test3"]
+    assert (datasets_dir / "Test1" / "input3.txt").is_file()
+
+
+def test_trash(
+    tmp_path: Path,
+) -> None:
+
+    folder: Path = tmp_path / "results"
+    (folder / "sub").mkdir(parents=True)
+    (folder / "sub" / "data.txt").write_text("data")
+    (tmp_path / "file.txt").write_text("data")
+
+    # Paths leave the tree at once and are deleted in the background
+    trash = Trash(tmp_path / ".trash")
+    trash.remove(folder)
+    trash.remove(tmp_path / "file.txt")
+    trash.remove(tmp_path / "missing")
+    assert not folder.exists()
+    assert not (tmp_path / "file.txt").exists()
+    trash.wait()
+    assert os.listdir(tmp_path / ".trash") == []
+
+    # Leftovers of an interrupted run
+    (tmp_path / ".trash" / "leftover").mkdir()
+    trash.empty()
+    trash.shutdown()
+    assert os.listdir(tmp_path / ".trash") == []
+
+    # Synchronous deletion
+    folder.mkdir()
+    Trash(tmp_path / ".other", background=False).remove(folder)
+    assert not folder.exists()
+    assert not (tmp_path / ".other").exists()
+
+
+@attrs.define
+class BatchProcess3(BatchProcess):
+
+    batch_size = 2
+
+    # Parameters (columns over the datasets for the variable ones)
+    param1: int = attrs.field(init=False, metadata={"input": True})
+    param2: float = attrs.field(init=False, metadata={"input": True})
+    param3: bool = attrs.field(init=False, metadata={"input": True})
+
+    # Paths (columns over the datasets)
+    path1: Path = attrs.field(init=False, metadata={"input": True})
+
+    # Outputs (columns over the datasets)
+    out1: Path = attrs.field(init=False, metadata={"output": True})
+    out2: Path = attrs.field(init=False, metadata={"output": True})
+
+    def __call__(self) -> None:
+        super().__call__()
+
+        self.operation1()
+
+    def operation1(self) -> None:
+
+        values = np.broadcast_to(self.param2, len(self.indices))
+        for file1, file2, value in zip(self.out1, self.out2, values):
+            with open(file1, "w") as f:
+                f.write(str(value))
+            with open(file2, "w") as f:
+                f.write("")
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_batch_process(
+    ready_config_path: Path,
+    test_config: list[dict[str, Any]],
+    jobs: int,
+) -> None:
+
+    run_app(ready_config_path, test_config)
+    expected = {study: read_paths(ready_config_path, study) for study in ["Study1", "Study2"]}
+
+    # Process3 executed by chunks of 2 datasets, in a single call each
+    test_config[2]["process"] = BatchProcess3
+    run_app(ready_config_path, test_config, jobs=jobs)
+
+    for study in ["Study1", "Study2"]:
+        dict_paths = json.loads(json.dumps(read_paths(ready_config_path, study)).replace("3_BatchProcess3", "3_Process3"))
+        assert dict_paths == expected[study]
+
+    # No per-dataset inputs file, parameters of each dataset
+    process_dir: Path = ready_config_path / APP_NAME / "Study2" / "3_BatchProcess3"
+    assert not (process_dir / "Test1" / "inputs.json").exists()
+    assert [(process_dir / idx / "output3.txt").read_text() for idx in ["Test1", "Test2", "Test3"]] == ["17.4", "19.3", "16.8"]
+
+
+def test_batch_inputs() -> None:
+
+    df_user_params = pd.DataFrame({"parameter4": [1.5, 2.5, 3.5], "parameter5": [True, False, True]}, index=["Test1", "Test2", "Test3"])
+    process = BatchProcess3(
+        df_user_params=df_user_params,
+        dict_user_params={"parameter2": 7},
+        dict_user_paths={},
+        dict_paths={"output2.txt": OutputPaths.from_dict({idx: os.path.join("study", "2_Process2", idx, "output2.txt") for idx in df_user_params.index})},
+        params={"param1": "parameter2", "param2": "parameter4", "param3": "parameter5"},
+        required_paths={"path1": "output2.txt"},
+        output_paths={"out1": "output3.txt", "out2": "output4.txt"},
+        fixed_params=["parameter2"],
+        variable_params=["parameter4", "parameter5"],
+        fixed_paths=[],
+        variable_paths=[],
+    )
+    process.initialize()
+    process.indices = ["Test1", "Test3"]
+    process.dataset_dirs = {idx: os.path.join("study", "3_Process3", idx) for idx in process.indices}
+    process.update_batch_inputs()
+
+    assert process.dict_inputs["param1"] == 7
+    np.testing.assert_array_equal(process.dict_inputs["param2"], [1.5, 3.5])
+    np.testing.assert_array_equal(process.dict_inputs["param3"], [True, True])
+    np.testing.assert_array_equal(process.dict_inputs["path1"], [os.path.join("study", "2_Process2", idx, "output2.txt") for idx in process.indices])
+
+    # Outputs of the chunk registered at once, by dataset or in order
+    process.update_outputs("output3.txt", ["a.txt", "b.txt"])
+    process.update_outputs("output4.txt", {"Test3": "c.txt"})
+    assert dict(process.dict_paths["output3.txt"]) == {
+        "Test1": os.path.join("study", "3_Process3", "Test1", "a.txt"),
+        "Test3": os.path.join("study", "3_Process3", "Test3", "b.txt"),
+    }
+    assert dict(process.dict_paths["output4.txt"]) == {"Test3": os.path.join("study", "3_Process3", "Test3", "c.txt")}
+
+
+def test_load_outputs(
+    tmp_path: Path,
+) -> None:
+
+    datasets = [f"Test{i}" for i in range(50)]
+    paths = {}
+    for i, idx in enumerate(datasets):
+        paths[idx] = str(tmp_path / f"{idx}.txt")
+        np.savetxt(paths[idx], [i, 2 * i])
+    paths["Test99"] = None
+
+    calls = []
+
+    def loader(path: str) -> np.ndarray:
+        calls.append(path)
+        return np.loadtxt(path)
+
+    df_user_params = pd.DataFrame({"parameter1": np.arange(50.0), "EXECUTE": 1}, index=datasets)
+    process = Process(
+        df_user_params=df_user_params,
+        dict_paths={"output.txt": OutputPaths.from_dict(paths)},
+        variable_params=["parameter1"],
+        working_dir=tmp_path,
+    )
+
+    # Outputs stacked by dataset (datasets without output are ignored)
+    indices, values = process.stack_outputs("output.txt", loader)
+    assert indices == datasets
+    np.testing.assert_array_equal(values, np.arange(50.0)[:, None] * [1, 2])
+    assert len(calls) == 50
+
+    # Outputs with the parameters of the datasets, unchanged outputs taken from cache
+    np.savetxt(paths["Test3"], [0, 0])
+    os.utime(paths["Test3"], ns=(0, 0))
+    df = Process(
+        df_user_params=df_user_params,
+        dict_paths={"output.txt": OutputPaths.from_dict(paths)},
+        variable_params=["parameter1"],
+        working_dir=tmp_path,
+    ).load_outputs("output.txt", lambda path: dict(zip(["a", "b"], loader(path))))
+    assert list(df.columns) == ["parameter1", "a", "b"]
+    assert df.loc["Test3", "b"] == 0
+    assert df.loc["Test4", "b"] == 8
+
+    df = process.load_outputs("output.txt", loader)
+    assert list(df.columns) == ["parameter1", "output.txt"]
+    assert len(calls) == 50 + 50 + 1
+
+    # Cache is kept on disk for the next runs
+    Process(
+        dict_paths={"output.txt": OutputPaths.from_dict(paths)},
+        working_dir=tmp_path,
+    ).stack_outputs("output.txt", loader)
+    assert len(calls) == 101
+    assert (tmp_path / ".outputs.pkl").is_file()
+
+
+def test_output_loader(
+    tmp_path: Path,
+) -> None:
+
+    (tmp_path / "Test1").mkdir()
+    (tmp_path / "Test1" / "value.txt").write_text("1")
+    (tmp_path / "Test2.txt").write_text("2")
+    dir_paths = {"Test1": str(tmp_path / "Test1")}
+    file_paths = {"Test2": str(tmp_path / "Test2.txt")}
+
+    # Loaders sharing a name are told apart by their code and bound values
+    loader = OutputLoader(tmp_path / ".outputs.pkl")
+    assert loader.load("output", file_paths, lambda path: int(Path(path).read_text())) == {"Test2": 2}
+    assert loader.load("output", file_paths, lambda path: 10 * int(Path(path).read_text())) == {"Test2": 20}
+
+    def scale(path: str, factor: int) -> int:
+        return factor * int(Path(path).read_text())
+
+    def make(factor: int) -> object:
+        return lambda path: scale(path, factor)
+
+    assert loader.load("output", file_paths, functools.partial(scale, factor=3)) == {"Test2": 6}
+    assert loader.load("output", file_paths, functools.partial(scale, factor=4)) == {"Test2": 8}
+    assert loader.load("output", file_paths, make(5)) == {"Test2": 10}
+    assert loader.load("output", file_paths, make(6)) == {"Test2": 12}
+
+    # Explicit key
+    assert loader.load("output", file_paths, make(7), key="seven") == {"Test2": 14}
+    assert loader.load("output", file_paths, make(8), key="seven") == {"Test2": 14}
+
+    # Directory output reloaded when a file inside is rewritten
+    def read_dir(path: str) -> int:
+        return int((Path(path) / "value.txt").read_text())
+
+    assert loader.load("output5", dir_paths, read_dir) == {"Test1": 1}
+    (tmp_path / "Test1" / "value.txt").write_text("22")
+    assert loader.load("output5", dir_paths, read_dir) == {"Test1": 22}